@@ -1,4 +1,25 @@
 import os
 
 LOG_FILE = os.path.join("logs", "events.log")
+# Strukturalny log JSON lines (jeden rekord na linię), domyślnie wyłączony
+LOG_JSON_FILE = os.path.join("logs", "events.jsonl")
+LOG_JSON_ENABLED = os.environ.get("SECURE_USB_LOG_JSON", "0") == "1"
 DB_FILE = os.path.join("db", "usb_devices.db")
+SCAN_LOG_DIR = os.path.join("logs", "scans")
+EXPORT_DIR = os.path.join("logs", "exports")
+
+# Gniazdo clamd; None = autodetekcja typowych ścieżek
+CLAMD_SOCKET = os.environ.get("SECURE_USB_CLAMD_SOCKET")
+
+# Liczba równoległych połączeń z clamd (0 = liczba rdzeni)
+SCAN_WORKERS = int(os.environ.get("SECURE_USB_SCAN_WORKERS", "0")) or os.cpu_count() or 1
+# Liczba procesów clamscan; każdy ładuje własną kopię bazy sygnatur (~1 GB RAM), stąd domyślnie 1
+CLAMSCAN_WORKERS = max(1, int(os.environ.get("SECURE_USB_CLAMSCAN_WORKERS", "1")))
+
+# Pomijanie niezmienionych plików, które już przeszły skan z bieżącą wersją sygnatur
+SCAN_CACHE_ENABLED = os.environ.get("SECURE_USB_SCAN_CACHE", "1") != "0"
+
+# Ile dni trzymać surowe zdarzenia; starsze są zwijane do liczników godzinowych/dziennych (0 = bez limitu)
+EVENT_RETENTION_DAYS = int(os.environ.get("SECURE_USB_EVENT_RETENTION_DAYS", "90"))
+# Odstęp między przebiegami retencji (sekundy)
+RETENTION_INTERVAL = int(os.environ.get("SECURE_USB_RETENTION_INTERVAL", "3600"))
@@ -1,9 +1,45 @@
-from src.logger import setup_logger
-from src.database import create_db
-from src.gui import USBMonitorApp
+import argparse
+import sys
+from src.logger import setup_logger, shutdown_logger
+from src.database import create_db, start_event_writer, stop_event_writer, get_connection, enable_incremental_vacuum
+from src.retention import start_retention, stop_retention
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Secure USB monitor")
+    parser.add_argument(
+        "--headless", action="store_true",
+        help="run the monitor as a service without the GUI (no Tk/customtkinter/PIL import)",
+    )
+    parser.add_argument(
+        "--enable-incremental-vacuum", action="store_true",
+        help="one-time maintenance: switch an existing database to incremental auto-vacuum "
+             "(full VACUUM, stop the monitor first) and exit",
+    )
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     setup_logger()
     create_db()
-    app = USBMonitorApp()
-    app.mainloop()
\ No newline at end of file
+    if args.enable_incremental_vacuum:
+        # Pełny VACUUM trzyma blokadę zapisu - osobny krok, nigdy w trakcie monitorowania
+        converted = enable_incremental_vacuum(get_connection())
+        shutdown_logger()
+        sys.exit(0 if converted else 1)
+    start_event_writer()
+    start_retention()
+    exit_code = 0
+    try:
+        if args.headless:
+            from src.daemon import run_daemon
+            exit_code = run_daemon()
+        else:
+            # GUI importujemy dopiero tutaj - tryb headless nie ładuje Tk
+            from src.gui import USBMonitorApp
+            app = USBMonitorApp()
+            app.mainloop()
+    finally:
+        stop_retention()
+        stop_event_writer()
+        shutdown_logger()
+    sys.exit(exit_code)
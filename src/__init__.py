@@ -1,7 +1,27 @@
 # Oznacza katalog `src` jako moduł Python
+import importlib
+
 __all__ = ["gui", "usb_monitor", "database"]
 
-# Opcjonalne importy dla łatwiejszego dostępu
-from .gui import USBMonitorApp
-from .usb_monitor import get_connected_devices, monitor_usb
-from .database import is_device_whitelisted, add_to_whitelist
+# Skróty do najczęściej używanych nazw; moduł ładuje się dopiero przy pierwszym dostępie,
+# więc CLI/daemon nie płacą za import GUI (customtkinter/tkinter/PIL) ani monitora
+_LAZY_ATTRIBUTES = {
+    "USBMonitorApp": "gui",
+    "get_connected_devices": "usb_monitor",
+    "monitor_usb": "usb_monitor",
+    "is_device_whitelisted": "database",
+    "add_to_whitelist": "database",
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__), name)
+    elif name in __all__:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_LAZY_ATTRIBUTES))
@@ -1,23 +1,233 @@
+import argparse
+import csv
+import json
 import sys
+import time
 import logging
 from .logger import setup_logger
-from .database import add_to_whitelist
+from .database import create_db, add_to_whitelist, bulk_add_to_whitelist, get_whitelist, iter_whitelist
 
-def main():
-    setup_logger()
-    if len(sys.argv) != 3:
-        print("Usage: python add_to_whitelist.py <vendor_id> <product_id>")
-        return
+COMMANDS = ("add", "import", "export")
+CSV_FIELDS = ("vendor_id", "product_id", "device_name")
+# Ile błędnych wierszy pokazać przed przerwaniem importu
+MAX_REPORTED_ERRORS = 10
+
+def normalize_usb_id(value):
+    """'0x0951', '0951', '0X951', 2385 -> '0x0951' (format używany przez monitor)."""
+    if isinstance(value, int):
+        number = value
+    else:
+        text = str(value).strip().lower()
+        number = int(text[2:] if text.startswith("0x") else text, 16)
+    if not 0 <= number <= 0xFFFF:
+        raise ValueError(f"USB id out of range: {value!r}")
+    return f"0x{number:04x}"
+
+def _open_input(path):
+    if path == "-":
+        return sys.stdin
+    return open(path, newline="", encoding="utf-8")
+
+def _open_output(path):
+    if path == "-":
+        return sys.stdout
+    return open(path, "w", newline="", encoding="utf-8")
+
+def _detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return "json" if path.lower().endswith(".json") else "csv"
+
+def read_csv_rows(f):
+    """Wiersze (vendor_id, product_id, device_name_or_None); nagłówek jest opcjonalny."""
+    for row in csv.reader(f):
+        if not row or not "".join(row).strip() or row[0].lstrip().startswith("#"):
+            continue
+        if row[0].strip().lower() in ("vendor_id", "vendorid"):
+            continue
+        name = row[2].strip() if len(row) > 2 and row[2].strip() else None
+        yield row[0], row[1] if len(row) > 1 else "", name
+
+def read_json_rows(f):
+    """
+    Tablica obiektów {vendor_id, product_id, device_name} lub list [vid, pid, nazwa].
+    Wpis innego typu daje None - load_entries zgłasza go jako błąd z numerem wpisu.
+    """
+    data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON array of entries")
+    for entry in data:
+        if isinstance(entry, dict):
+            yield entry.get("vendor_id", ""), entry.get("product_id", ""), entry.get("device_name") or None
+        elif isinstance(entry, list) and 2 <= len(entry) <= 3:
+            entry = entry + [None] * (3 - len(entry))
+            yield entry[0], entry[1], entry[2] or None
+        else:
+            yield None
 
-    vendor_id = sys.argv[1]
-    product_id = sys.argv[2]
+def load_entries(rows):
+    """
+    Normalizuje identyfikatory i usuwa duplikaty (wygrywa ostatnie wystąpienie).
 
+    Zwraca (wpisy_w_kolejności, liczba_duplikatów, błędy).
+    """
+    entries = {}
+    duplicates = 0
+    errors = []
+    for line, row in enumerate(rows, 1):
+        if row is None:
+            errors.append(f"entry {line}: expected an object or a [vendor_id, product_id, device_name] list")
+            continue
+        vendor_id, product_id, name = row
+        try:
+            key = (normalize_usb_id(vendor_id), normalize_usb_id(product_id))
+        except (ValueError, TypeError):
+            errors.append(f"entry {line}: invalid vendor/product id {vendor_id!r}:{product_id!r}")
+            continue
+        if key in entries:
+            duplicates += 1
+            # Późniejszy wpis bez nazwy nie kasuje nazwy z wcześniejszego
+            previous = entries.pop(key)
+            name = name or previous
+        entries[key] = name
+    return [(vendor_id, product_id, name) for (vendor_id, product_id), name in entries.items()], duplicates, errors
+
+def diff_entries(entries, current):
+    """Dzieli wpisy na nowe, zmienione (nowa nazwa) i bez zmian względem bieżącej whitelisty."""
+    added, changed, unchanged = [], [], 0
+    for vendor_id, product_id, name in entries:
+        key = (vendor_id, product_id)
+        if key not in current:
+            added.append((vendor_id, product_id, name or "Unknown Device"))
+        elif name is not None and name != current[key]:
+            changed.append((vendor_id, product_id, current[key], name))
+        else:
+            unchanged += 1
+    return added, changed, unchanged
+
+def cmd_add(args):
+    try:
+        vendor_id, product_id = normalize_usb_id(args.vendor_id), normalize_usb_id(args.product_id)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
     try:
-        add_to_whitelist(vendor_id, product_id)
+        add_to_whitelist(vendor_id, product_id, args.name)
         print(f"Added to whitelist: {vendor_id}:{product_id}")
     except Exception as e:
         logging.error(f"Add to whitelist failed: {e}")
         print(f"Error: {e}")
+        return 1
+    return 0
+
+def cmd_import(args):
+    fmt = _detect_format(args.file, args.format)
+    reader = read_json_rows if fmt == "json" else read_csv_rows
+    start = time.perf_counter()
+    f = None
+    try:
+        f = _open_input(args.file)
+        entries, duplicates, errors = load_entries(reader(f))
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"Error: cannot read {args.file}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if f is not None and f is not sys.stdin:
+            f.close()
+
+    if errors:
+        # Import jest atomowy - błędne dane przerywają go w całości
+        for error in errors[:MAX_REPORTED_ERRORS]:
+            print(f"Error: {error}", file=sys.stderr)
+        if len(errors) > MAX_REPORTED_ERRORS:
+            print(f"... and {len(errors) - MAX_REPORTED_ERRORS} more", file=sys.stderr)
+        print("Nothing imported.", file=sys.stderr)
+        return 1
+
+    current = {(vendor_id, product_id): name for vendor_id, product_id, name in get_whitelist()}
+    added, changed, unchanged = diff_entries(entries, current)
+    summary = f"{len(added)} new, {len(changed)} renamed, {unchanged} unchanged, {duplicates} duplicates merged"
+
+    if args.dry_run:
+        for vendor_id, product_id, name in added:
+            print(f"+ {vendor_id}:{product_id} {name}")
+        for vendor_id, product_id, old_name, new_name in changed:
+            print(f"~ {vendor_id}:{product_id} {old_name} -> {new_name}")
+        print(f"Dry run: {summary}")
+        return 0
+
+    try:
+        count = bulk_add_to_whitelist(entries)
+    except Exception as e:
+        print(f"Error: import failed, nothing written: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"Imported {count} entries ({summary}) in {elapsed:.2f}s ({count / elapsed if elapsed else 0:,.0f} rows/s)")
+    return 0
+
+def cmd_export(args):
+    fmt = _detect_format(args.file, args.format)
+    start = time.perf_counter()
+    count = 0
+    f = None
+    try:
+        f = _open_output(args.file)
+        if fmt == "json":
+            # Tablica JSON pisana wiersz po wierszu, bez ładowania całej whitelisty
+            f.write("[")
+            for count, row in enumerate(iter_whitelist(), 1):
+                f.write(("\n    " if count == 1 else ",\n    ") + json.dumps(dict(zip(CSV_FIELDS, row))))
+            f.write("\n]\n" if count else "]\n")
+        else:
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDS)
+            for count, row in enumerate(iter_whitelist(), 1):
+                writer.writerow(row)
+    except OSError as e:
+        print(f"Error: cannot write {args.file}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if f is not None and f is not sys.stdout:
+            f.close()
+    elapsed = time.perf_counter() - start
+    print(f"Exported {count} entries in {elapsed:.2f}s ({count / elapsed if elapsed else 0:,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.add_to_whitelist",
+        description="Manage the USB device whitelist. The legacy form `<vendor_id> <product_id>` still works.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="add a single device")
+    add.add_argument("vendor_id")
+    add.add_argument("product_id")
+    add.add_argument("name", nargs="?", default="Unknown Device")
+    add.set_defaults(func=cmd_add)
+
+    imp = sub.add_parser("import", help="bulk import from CSV/JSON (one transaction)")
+    imp.add_argument("file", nargs="?", default="-", help="input file, '-' for stdin (default)")
+    imp.add_argument("--format", choices=("csv", "json"), help="default: from the file extension, csv for stdin")
+    imp.add_argument("--dry-run", action="store_true", help="show what would change without writing")
+    imp.set_defaults(func=cmd_import)
+
+    exp = sub.add_parser("export", help="stream the whitelist to CSV/JSON")
+    exp.add_argument("file", nargs="?", default="-", help="output file, '-' for stdout (default)")
+    exp.add_argument("--format", choices=("csv", "json"), help="default: from the file extension, csv for stdout")
+    exp.set_defaults(func=cmd_export)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Zgodność wstecz: `add_to_whitelist.py <vendor_id> <product_id>`
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith("-"):
+        argv = ["add"] + argv
+    args = build_parser().parse_args(argv)
+    setup_logger()
+    # Na świeżej maszynie CLI bywa uruchamiane przed GUI - schemat musi istnieć
+    create_db()
+    return args.func(args)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Tryb bez GUI (serwery, kioski): pętla monitora + obsługa alertów.
+
+Moduł nie może importować tkinter/customtkinter/PIL - ani bezpośrednio,
+ani przez src/__init__ czy src.gui.
+"""
+import logging
+import queue
+import signal
+import threading
+from .usb_monitor import monitor_usb, alert_queue, stop_event, get_unauthorized_action
+
+log = logging.getLogger('secure_usb.daemon')
+
+ALERT_POLL_INTERVAL = 0.5
+MONITOR_JOIN_TIMEOUT = 5.0
+
+def handle_alert(vendor_id, product_id, bsd_name, device_classes):
+    """
+    Odpowiednik banera GUI: alert trafia tylko do logu. Historię zdarzeń zapisuje
+    już monitor, tak samo jak przy GUI - drugi wiersz zawyżałby statystyki.
+    """
+    action = get_unauthorized_action(device_classes)
+    log.warning(
+        f"ALERT {action}: {vendor_id}:{product_id}"
+        f"{f' ({bsd_name})' if bsd_name else ''} Classes: {list(device_classes)}"
+    )
+
+def _request_stop(signum, _frame):
+    log.info(f"Received {signal.Signals(signum).name}, stopping")
+    stop_event.set()
+
+def run_daemon():
+    """Uruchamia monitor w tle i obsługuje alerty do SIGTERM/SIGINT; zwraca kod wyjścia."""
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    monitor = threading.Thread(target=monitor_usb, args=(None,), name="usb-monitor", daemon=True)
+    monitor.start()
+    log.info("Headless monitor started")
+
+    while not stop_event.is_set():
+        try:
+            alert = alert_queue.get(timeout=ALERT_POLL_INTERVAL)
+        except queue.Empty:
+            if not monitor.is_alive() and not stop_event.is_set():
+                log.error("Monitor thread exited unexpectedly")
+                return 1
+            continue
+        try:
+            handle_alert(*alert)
+        except Exception as e:
+            log.error(f"Alert handling error: {e}")
+
+    monitor.join(MONITOR_JOIN_TIMEOUT)
+    # Alerty zgłoszone tuż przed zatrzymaniem też trafiają do logu
+    while not alert_queue.empty():
+        handle_alert(*alert_queue.get_nowait())
+    log.info("Headless monitor stopped")
+    return 0
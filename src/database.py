@@ -3,16 +3,319 @@
 import sqlite3
 import logging
 import os
+import queue
+import threading
+import time
+from datetime import datetime
 from config import DB_FILE
 
 log = logging.getLogger('secure_usb.database')
 
+# Każdy wątek (monitor, GUI, CLI) dostaje własne, długo żyjące połączenie
+_local = threading.local()
+
+BUSY_TIMEOUT_MS = 5000
+EVENT_QUEUE_SIZE = 10000
+EVENT_BATCH_SIZE = 100
+EVENT_FLUSH_INTERVAL = 0.25
+EVENT_PUT_TIMEOUT = 0.5
+EVENT_RETRY_INITIAL = 0.5
+EVENT_RETRY_MAX = 30.0
+
+VERDICT_CLEAN = "clean"
+VERDICT_INFECTED = "infected"
+CACHE_SIZE_KB = 8192
+STATEMENT_CACHE_SIZE = 64
+
+# Wersja schematu zapisana w PRAGMA user_version (patrz _MIGRATIONS)
+SCHEMA_VERSION = 3
+AUTO_VACUUM_INCREMENTAL = 2
+AGGREGATE_BUCKETS = {
+    "hour": "strftime('%Y-%m-%d %H:00', e.ts, 'unixepoch', 'localtime')",
+    "day": "date(e.ts, 'unixepoch', 'localtime')",
+}
+ROLLUP_TABLES = {"hour": "event_counts_hourly", "day": "event_counts_daily"}
+
+# Stałe teksty zapytań - sqlite3 ponownie używa przygotowanych instrukcji
+# z cache połączenia, o ile tekst SQL jest identyczny
+_SQL_ADD_TO_WHITELIST = """
+    INSERT OR REPLACE INTO whitelist (id, vendor_id, product_id, device_name) 
+    VALUES (
+        (SELECT id FROM whitelist WHERE vendor_id=? AND product_id=?),
+        ?, ?, ?
+    )
+"""
+_SQL_REMOVE_FROM_WHITELIST = "DELETE FROM whitelist WHERE vendor_id=? AND product_id=?"
+_SQL_SELECT_WHITELIST = "SELECT vendor_id, product_id, device_name FROM whitelist ORDER BY id"
+_SQL_WHITELIST_VERSION = "SELECT version FROM whitelist_version WHERE id = 1"
+# Brak nazwy w imporcie nie nadpisuje istniejącej nazwy urządzenia
+_SQL_UPSERT_WHITELIST = """
+    INSERT INTO whitelist (vendor_id, product_id, device_name)
+    VALUES (?1, ?2, COALESCE(?3, 'Unknown Device'))
+    ON CONFLICT (vendor_id, product_id) DO UPDATE SET device_name = COALESCE(?3, device_name)
+"""
+_SQL_GET_SCAN_VERDICT = """
+    SELECT verdict FROM scan_cache
+    WHERE file_hash=? AND size=? AND mtime_ns=? AND signature_version=?
+"""
+_SQL_STORE_SCAN_VERDICT = """
+    INSERT OR REPLACE INTO scan_cache (file_hash, size, mtime_ns, signature_version, verdict)
+    VALUES (?, ?, ?, ?, ?)
+"""
+# Urządzenia są internowane w tabeli devices; zdarzenie wskazuje je przez device_id
+_SQL_INTERN_DEVICE = "INSERT OR IGNORE INTO devices (vendor_id, product_id) VALUES (?, ?)"
+_SQL_LOG_EVENT = """
+    INSERT INTO events (ts, device_id, action)
+    VALUES (?, (SELECT id FROM devices WHERE vendor_id=? AND product_id=?), ?)
+"""
+
+class WhitelistCache:
+    """
+    In-memory map of whitelisted (vendor_id, product_id) pairs to device names.
+
+    Loaded once, updated in place by add/remove (write-through) and reloaded
+    when another connection or process changes the whitelist, detected via the
+    trigger-maintained whitelist_version counter read on a dedicated watch
+    connection (checked at most once per `check_interval` seconds, so lookups
+    stay at dict speed). Commits to other tables do not cause a reload.
+
+    `version` is bumped on every change of the contents, so views can
+    re-render only when it moves.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.version = 0
+        self._entries = None
+        self._lock = threading.Lock()
+        self._watch_conn = None
+        self._marker = None
+        self._next_check = 0.0
+
+    def _read_marker(self):
+        if self._watch_conn is None:
+            os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
+            self._watch_conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        return self._watch_conn.execute(_SQL_WHITELIST_VERSION).fetchone()[0]
+
+    def _reload(self):
+        # Wersję odczytujemy przed danymi - zapis w międzyczasie wymusi kolejny reload
+        self._marker = self._read_marker()
+        entries = {(row[0], row[1]): row[2] for row in self._watch_conn.execute(_SQL_SELECT_WHITELIST)}
+        if entries != self._entries:
+            self._entries = entries
+            self.version += 1
+        log.debug(f"Whitelist cache loaded ({len(self._entries)} entries)")
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._entries is not None and now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        if self._entries is None or self._read_marker() != self._marker:
+            self._reload()
+
+    def contains(self, vendor_id, product_id):
+        with self._lock:
+            self._ensure_fresh()
+            return (vendor_id, product_id) in self._entries
+
+    def items(self):
+        """Return (vendor_id, product_id, device_name) tuples in insertion (id) order."""
+        with self._lock:
+            self._ensure_fresh()
+            return [(vendor_id, product_id, name) for (vendor_id, product_id), name in self._entries.items()]
+
+    def get_version(self):
+        with self._lock:
+            self._ensure_fresh()
+            return self.version
+
+    def add(self, vendor_id, product_id, device_name=None):
+        with self._lock:
+            if self._entries is not None and self._entries.get((vendor_id, product_id), object()) != device_name:
+                self._entries[(vendor_id, product_id)] = device_name
+                self.version += 1
+
+    def discard(self, vendor_id, product_id):
+        with self._lock:
+            if self._entries is not None and (vendor_id, product_id) in self._entries:
+                del self._entries[(vendor_id, product_id)]
+                self.version += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = None
+
+whitelist_cache = WhitelistCache()
+
+def get_connection():
+    """Return this thread's long-lived connection, opening and tuning it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
+        conn = sqlite3.connect(
+            DB_FILE,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        # WAL: czytelnicy (GUI) nie blokują zapisującego (monitor) i odwrotnie
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _local.conn = conn
+    return conn
+
+def close_connection():
+    """Close the calling thread's connection (if any)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+def _migrate_to_v1(c):
+    """
+    TEXT timestamps in `logs` -> integer epoch seconds in `events`, devices
+    interned in `devices`, indexes on (ts) and (device_id, ts). `logs` stays
+    available as a read-only view with the old columns.
+    """
+    c.execute('''
+        CREATE TABLE devices (
+            id INTEGER PRIMARY KEY,
+            vendor_id TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            UNIQUE(vendor_id, product_id)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER NOT NULL,
+            device_id INTEGER REFERENCES devices(id),
+            action TEXT NOT NULL
+        )
+    ''')
+
+    legacy = c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='logs'").fetchone()
+    if legacy:
+        c.execute('''
+            INSERT OR IGNORE INTO devices (vendor_id, product_id)
+            SELECT DISTINCT vendor_id, product_id FROM logs
+        ''')
+        # Stare znaczniki czasu to czas lokalny 'YYYY-MM-DD HH:MM:SS'
+        c.execute('''
+            INSERT INTO events (id, ts, device_id, action)
+            SELECT l.id, COALESCE(CAST(strftime('%s', l.timestamp, 'utc') AS INTEGER), 0), d.id, l.action
+            FROM logs l
+            LEFT JOIN devices d ON d.vendor_id = l.vendor_id AND d.product_id = l.product_id
+        ''')
+        c.execute("DROP TABLE logs")
+
+    # Indeksy po imporcie - szybciej niż utrzymywanie ich przy każdym INSERT
+    c.execute("CREATE INDEX idx_events_ts ON events (ts)")
+    c.execute("CREATE INDEX idx_events_device_ts ON events (device_id, ts)")
+    # Agregaty typu "nieautoryzowane podłączenia dziennie" bez odczytu tabeli
+    c.execute("CREATE INDEX idx_events_action_ts ON events (action, ts)")
+    c.execute('''
+        CREATE VIEW logs AS
+        SELECT e.id, datetime(e.ts, 'unixepoch', 'localtime') AS timestamp,
+               d.vendor_id, d.product_id, e.action
+        FROM events e LEFT JOIN devices d ON d.id = e.device_id
+    ''')
+
+def _migrate_to_v2(c):
+    """
+    Roll-up tables for the retention engine: event counts per device and
+    action, keyed by the bucket start (UTC hour / local midnight, epoch
+    seconds). device_id 0 stands for events without a device.
+    """
+    for table in ("event_counts_hourly", "event_counts_daily"):
+        c.execute(f'''
+            CREATE TABLE {table} (
+                ts INTEGER NOT NULL,
+                device_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (ts, device_id, action)
+            ) WITHOUT ROWID
+        ''')
+
+def _migrate_to_v3(c):
+    """
+    Whitelist-only change counter for WhitelistCache. PRAGMA data_version
+    moves on every commit (events, retention, scan cache), this one only
+    when the whitelist table itself changes.
+    """
+    c.execute('''
+        CREATE TABLE whitelist_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    c.execute("INSERT INTO whitelist_version (id, version) VALUES (1, 0)")
+    for operation in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(f'''
+            CREATE TRIGGER whitelist_version_{operation.lower()} AFTER {operation} ON whitelist
+            BEGIN
+                UPDATE whitelist_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+# Indeks = wersja źródłowa; każda migracja podnosi user_version o 1
+_MIGRATIONS = [_migrate_to_v1, _migrate_to_v2, _migrate_to_v3]
+
+def is_incremental_vacuum_enabled(conn):
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+def enable_incremental_vacuum(conn):
+    """
+    Switch the file to auto_vacuum=INCREMENTAL so retention can hand freed
+    pages back with PRAGMA incremental_vacuum. On an existing database this
+    takes one full VACUUM that holds the write lock for its whole run, so it
+    is a maintenance step (main.py --enable-incremental-vacuum), never run
+    while the monitor is live. Gives up at once when another connection
+    holds the lock; returns True when the mode is active.
+    """
+    if is_incremental_vacuum_enabled(conn):
+        return True
+    start = time.perf_counter()
+    conn.commit()
+    conn.execute("PRAGMA busy_timeout=0")
+    try:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    except sqlite3.OperationalError as e:
+        log.warning(f"Cannot switch to incremental auto-vacuum: {e}")
+        return False
+    finally:
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    log.info(f"Database switched to incremental auto-vacuum in {time.perf_counter() - start:.2f}s")
+    return True
+
+def _migrate(conn):
+    """Apply pending schema migrations, each in its own transaction."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _MIGRATIONS[target - 1](conn.cursor())
+            conn.execute(f"PRAGMA user_version={target}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        log.info(f"Database schema migrated to version {target} in {time.perf_counter() - start:.2f}s")
+
 def create_db():
     """Create the SQLite database and initialize tables."""
-    conn = None
     try:
-        os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_connection()
+        if not conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+            # Pusta baza: VACUUM nic nie kosztuje; istniejące konwertuje się osobno (--enable-incremental-vacuum)
+            enable_incremental_vacuum(conn)
         c = conn.cursor()
         
         # Tabela whitelist
@@ -32,89 +335,410 @@ def create_db():
         except sqlite3.OperationalError:
             pass # Kolumna już istnieje, ignorujemy błąd
 
-        # Tabela logów
+        # Cache werdyktów skanera (pomijanie niezmienionych, czystych plików)
         c.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                vendor_id TEXT,
-                product_id TEXT,
-                action TEXT NOT NULL
-            )
+            CREATE TABLE IF NOT EXISTS scan_cache (
+                file_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                signature_version TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                PRIMARY KEY (file_hash, size, mtime_ns, signature_version)
+            ) WITHOUT ROWID
         ''')
         conn.commit()
+        _migrate(conn)
+        whitelist_cache.invalidate()
         log.info("Database initialized successfully")
     except sqlite3.Error as e:
         log.error(f"Database creation error: {e}")
         raise
-    finally:
-        if conn:
-            conn.close()
 
 def is_device_whitelisted(vendor_id, product_id):
-    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM whitelist WHERE vendor_id=? AND product_id=?", (vendor_id, product_id))
-        return c.fetchone() is not None
+        return whitelist_cache.contains(vendor_id, product_id)
     except sqlite3.Error as e:
         log.error(f"Error checking whitelist: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
+
+def get_whitelist_version():
+    """
+    Change counter of the whitelist: moves on add/remove in this process and
+    when another process changes the whitelist (whitelist_version counter).
+    """
+    try:
+        return whitelist_cache.get_version()
+    except sqlite3.Error as e:
+        log.error(f"Error checking whitelist version: {e}")
+        return None
+
+def get_whitelist():
+    """Return all whitelist rows as (vendor_id, product_id, device_name) tuples."""
+    try:
+        return whitelist_cache.items()
+    except sqlite3.Error as e:
+        log.error(f"Error reading whitelist: {e}")
+        return []
 
 # --- ZMIANA: Dodano parametr device_name ---
 def add_to_whitelist(vendor_id, product_id, device_name="Unknown Device"):
-    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        # Używamy INSERT OR REPLACE, aby zaktualizować nazwę, jeśli urządzenie już jest
-        c.execute("""
-            INSERT OR REPLACE INTO whitelist (id, vendor_id, product_id, device_name) 
-            VALUES (
-                (SELECT id FROM whitelist WHERE vendor_id=? AND product_id=?),
-                ?, ?, ?
-            )
-        """, (vendor_id, product_id, vendor_id, product_id, device_name))
-        conn.commit()
+        with get_connection() as conn:
+            # Używamy INSERT OR REPLACE, aby zaktualizować nazwę, jeśli urządzenie już jest
+            conn.execute(_SQL_ADD_TO_WHITELIST, (vendor_id, product_id, vendor_id, product_id, device_name))
+        whitelist_cache.add(vendor_id, product_id, device_name)
         log.info(f"Added to whitelist: {vendor_id}:{product_id} ({device_name})")
     except sqlite3.Error as e:
         log.error(f"Error adding to whitelist: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 def remove_from_whitelist(vendor_id, product_id):
-    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("DELETE FROM whitelist WHERE vendor_id=? AND product_id=?", (vendor_id, product_id))
-        conn.commit()
+        with get_connection() as conn:
+            c = conn.execute(_SQL_REMOVE_FROM_WHITELIST, (vendor_id, product_id))
+        whitelist_cache.discard(vendor_id, product_id)
         if c.rowcount > 0:
             log.info(f"Removed from whitelist: {vendor_id}:{product_id}")
         else:
             log.warning(f"Device not found in whitelist: {vendor_id}:{product_id}")
     except sqlite3.Error as e:
         log.error(f"Error removing from whitelist: {e}")
-    finally:
-        if conn:
-            conn.close()
+
+def bulk_add_to_whitelist(rows):
+    """
+    Upsert (vendor_id, product_id, device_name) rows in a single transaction.
+
+    A None device_name keeps the stored name (new entries get 'Unknown
+    Device'). Raises sqlite3.Error; nothing is written if any row fails.
+    """
+    rows = list(rows)
+    try:
+        with get_connection() as conn:
+            conn.executemany(_SQL_UPSERT_WHITELIST, rows)
+    except sqlite3.Error as e:
+        log.error(f"Error importing {len(rows)} whitelist entries: {e}")
+        raise
+    # Przeładowanie przy następnym odczycie podbija wersję, jeśli coś się zmieniło
+    whitelist_cache.invalidate()
+    log.info(f"Imported {len(rows)} whitelist entries")
+    return len(rows)
+
+def iter_whitelist(batch_size=1000):
+    """Stream (vendor_id, product_id, device_name) rows straight from the database, in id order."""
+    cursor = get_connection().execute(_SQL_SELECT_WHITELIST)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+def get_scan_verdict(file_hash, size, mtime_ns, signature_version):
+    """Return the cached verdict ('clean'/'infected') for a file version, or None."""
+    try:
+        row = get_connection().execute(_SQL_GET_SCAN_VERDICT, (file_hash, size, mtime_ns, signature_version)).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        log.error(f"Error reading scan cache: {e}")
+        return None
+
+def store_scan_verdicts(rows):
+    """Store (file_hash, size, mtime_ns, signature_version, verdict) rows in one transaction."""
+    try:
+        with get_connection() as conn:
+            conn.executemany(_SQL_STORE_SCAN_VERDICT, rows)
+    except sqlite3.Error as e:
+        log.error(f"Error writing scan cache: {e}")
+
+class EventWriter:
+    """
+    Background writer for log_event rows.
+
+    Events go onto a bounded queue; a writer thread inserts them in
+    multi-row transactions every `batch_size` events or `flush_interval`
+    seconds, whichever comes first. A batch that fails (e.g. the database
+    is locked past the busy timeout) stays pending and is retried with
+    exponential backoff; new events keep collecting behind it, up to
+    `max_queue` pending rows.
+
+    Backpressure: when the queue is full, submit() blocks for at most
+    `put_timeout` seconds, then drops the event and counts it in `dropped`
+    (the monitor thread is never blocked for long). Events that arrive
+    while `max_queue` rows are already pending, and rows still unwritten
+    when the writer stops, are dropped and counted the same way.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size=EVENT_BATCH_SIZE, flush_interval=EVENT_FLUSH_INTERVAL,
+                 max_queue=EVENT_QUEUE_SIZE, put_timeout=EVENT_PUT_TIMEOUT,
+                 retry_initial=EVENT_RETRY_INITIAL, retry_max=EVENT_RETRY_MAX):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_pending = max_queue
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+        self.retries = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue a (timestamp, vendor_id, product_id, action) row; False if it was dropped."""
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            log.warning(f"Event queue full, dropped event: {row[3]} for {row[1]}:{row[2]}")
+            return False
+
+    def flush(self, timeout=BUSY_TIMEOUT_MS / 1000 + 5.0):
+        """Block until every event queued so far has been written."""
+        if not self.is_running():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout=BUSY_TIMEOUT_MS / 1000 + 5.0):
+        """Flush pending events and stop the writer thread."""
+        if not self.is_running():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        log.info(f"Event writer stopped: {self.stats()}")
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+    def _run(self):
+        pending = []
+        waiters = []
+        deadline = None
+        backoff = 0.0
+        try:
+            while True:
+                timeout = None if not pending else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._STOP:
+                    if pending and not self._write(pending):
+                        self._drop(len(pending), "writer stopped before the database became writable")
+                    for waiter in waiters:
+                        waiter.set()
+                    return
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    if not backoff:
+                        deadline = time.monotonic()
+                elif item is not None:
+                    try:
+                        params = _event_params(*item)
+                    except ValueError as e:
+                        self._drop(1, f"invalid timestamp {item[0]!r}: {e}")
+                    else:
+                        if len(pending) >= self.max_pending:
+                            self._drop(1, f"{len(pending)} events already waiting for the database")
+                        else:
+                            if not pending:
+                                deadline = time.monotonic() + self.flush_interval
+                            pending.append(params)
+
+                if pending and (time.monotonic() >= deadline or (not backoff and len(pending) >= self.batch_size)):
+                    if self._write(pending):
+                        pending = []
+                        backoff = 0.0
+                    else:
+                        # Partia zostaje w kolejce oczekujących - ponowienie z narastającą przerwą
+                        self.retries += 1
+                        backoff = min(max(backoff * 2, self.retry_initial), self.retry_max)
+                        deadline = time.monotonic() + backoff
+                if not pending and waiters:
+                    for waiter in waiters:
+                        waiter.set()
+                    waiters = []
+        finally:
+            close_connection()
+
+    def _drop(self, count, reason):
+        self.dropped += count
+        log.error(f"Dropped {count} events: {reason}")
+
+    def _write(self, rows):
+        """Insert (ts, vendor_id, product_id, action) rows in one transaction; False if it failed."""
+        start = time.perf_counter()
+        try:
+            with get_connection() as conn:
+                conn.executemany(_SQL_INTERN_DEVICE, {(row[1], row[2]) for row in rows})
+                conn.executemany(_SQL_LOG_EVENT, rows)
+        except sqlite3.Error as e:
+            log.warning(f"Writing {len(rows)} events failed, will retry: {e}")
+            return False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.written += len(rows)
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+        log.debug(f"Flushed {len(rows)} events in {elapsed_ms:.1f} ms (queue depth: {self._queue.qsize()})")
+        return True
+
+event_writer = EventWriter()
+
+def start_event_writer():
+    """Route log_event through the background writer."""
+    event_writer.start()
+
+def stop_event_writer():
+    """Flush queued events and stop the background writer."""
+    event_writer.stop()
 
 def log_event(timestamp, vendor_id, product_id, action):
-    conn = None
+    """Record a device event; `timestamp` is epoch seconds (or a legacy local-time string)."""
+    if event_writer.is_running():
+        event_writer.submit((timestamp, vendor_id, product_id, action))
+        return
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("INSERT INTO logs (timestamp, vendor_id, product_id, action) VALUES (?, ?, ?, ?)",
-                  (timestamp, vendor_id, product_id, action))
-        conn.commit()
+        with get_connection() as conn:
+            conn.execute(_SQL_INTERN_DEVICE, (vendor_id, product_id))
+            conn.execute(_SQL_LOG_EVENT, _event_params(timestamp, vendor_id, product_id, action))
         log.debug(f"Logged event: {action} for {vendor_id}:{product_id}")
-    except sqlite3.Error as e:
+    except (sqlite3.Error, ValueError) as e:
         log.error(f"Error logging event: {e}")
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+
+def _event_params(timestamp, vendor_id, product_id, action):
+    return (to_epoch(timestamp), vendor_id, product_id, action)
+
+def to_epoch(value):
+    """
+    Normalize a point in time to integer epoch seconds.
+
+    Accepts numbers, datetime objects and local-time strings such as
+    '2024-05-01' or '2024-05-01 13:45:00'; None passes through.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    return int(value.timestamp())
+
+def _event_filter_sql(since=None, until=None, vendor_id=None, product_id=None, action=None):
+    """WHERE clause and parameters over `events e LEFT JOIN devices d`."""
+    clauses, params = [], []
+    if vendor_id is not None and product_id is not None:
+        # Jedno urządzenie - trafia w indeks (device_id, ts)
+        clauses.append("e.device_id = (SELECT id FROM devices WHERE vendor_id=? AND product_id=?)")
+        params += [vendor_id, product_id]
+    elif vendor_id is not None:
+        clauses.append("d.vendor_id = ?")
+        params.append(vendor_id)
+    elif product_id is not None:
+        clauses.append("d.product_id = ?")
+        params.append(product_id)
+    if since is not None:
+        clauses.append("e.ts >= ?")
+        params.append(to_epoch(since))
+    if until is not None:
+        clauses.append("e.ts <= ?")
+        params.append(to_epoch(until))
+    if action is not None:
+        clauses.append("e.action = ?")
+        params.append(action)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+def _event_source(vendor_id=None, product_id=None):
+    """Join devices only when filtering by vendor or product alone."""
+    if (vendor_id is None) != (product_id is None):
+        return "events e LEFT JOIN devices d ON d.id = e.device_id"
+    return "events e"
+
+def query_events(since=None, until=None, vendor_id=None, product_id=None, action=None,
+                 limit=None, descending=False, local_time=False):
+    """
+    Return a cursor over (id, ts, vendor_id, product_id, action) rows ordered by time.
+
+    Filters are optional and combined with AND; `since`/`until` are inclusive
+    and accept anything to_epoch() does. With `local_time` the ts column is
+    rendered as a local 'YYYY-MM-DD HH:MM:SS' string (the legacy format).
+    Meant for streaming with fetchmany; sqlite3.Error propagates to the caller.
+    """
+    where, params = _event_filter_sql(since, until, vendor_id, product_id, action)
+    ts = "datetime(e.ts, 'unixepoch', 'localtime')" if local_time else "e.ts"
+    order = "DESC" if descending else "ASC"
+    sql = (
+        f"SELECT e.id, {ts}, d.vendor_id, d.product_id, e.action "
+        f"FROM events e LEFT JOIN devices d ON d.id = e.device_id{where} "
+        f"ORDER BY e.ts {order}, e.id {order}"
+    )
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return get_connection().execute(sql, params)
+
+def count_events(since=None, until=None, vendor_id=None, product_id=None, action=None):
+    """Number of events matching the query_events() filters."""
+    where, params = _event_filter_sql(since, until, vendor_id, product_id, action)
+    sql = f"SELECT COUNT(*) FROM {_event_source(vendor_id, product_id)}{where}"
+    return get_connection().execute(sql, params).fetchone()[0]
+
+def get_device_events(vendor_id, product_id, since=None, until=None, limit=None):
+    """Events of one device, newest first."""
+    try:
+        return query_events(since, until, vendor_id, product_id, limit=limit, descending=True).fetchall()
+    except (sqlite3.Error, ValueError) as e:
+        log.error(f"Error reading events for {vendor_id}:{product_id}: {e}")
+        return []
+
+def aggregate_events(bucket="day", since=None, until=None, vendor_id=None, product_id=None, action=None):
+    """
+    Event counts per local-time bucket ('hour' or 'day') and action.
+
+    Includes events already rolled up by retention; for those, `since` and
+    `until` are matched against the roll-up bucket start.
+    Returns (bucket, action, count) tuples, e.g. ('2024-05-01', 'CONNECTED_UNAUTH', 12).
+    """
+    try:
+        where, params = _event_filter_sql(since, until, vendor_id, product_id, action)
+        source = _event_source(vendor_id, product_id)
+        rollup = ROLLUP_TABLES[bucket]
+        sql = (
+            f"SELECT bucket, action, SUM(n) FROM ("
+            f"SELECT {AGGREGATE_BUCKETS[bucket]} AS bucket, e.action, COUNT(*) AS n "
+            f"FROM {source}{where} GROUP BY bucket, e.action "
+            f"UNION ALL "
+            f"SELECT {AGGREGATE_BUCKETS[bucket]} AS bucket, e.action, SUM(e.count) AS n "
+            f"FROM {source.replace('events e', f'{rollup} e')}{where} GROUP BY bucket, e.action"
+            f") GROUP BY bucket, action ORDER BY bucket, action"
+        )
+        return get_connection().execute(sql, params + params).fetchall()
+    except (sqlite3.Error, ValueError) as e:
+        log.error(f"Error aggregating events: {e}")
+        return []
@@ -0,0 +1,173 @@
+import csv
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from config import EXPORT_DIR
+from .database import query_events, count_events, close_connection
+
+log = logging.getLogger('secure_usb.exporter')
+
+# Liczba wierszy pobieranych naraz z kursora (fetchmany) i zapisywanych jednym wywołaniem
+EXPORT_BATCH_SIZE = 2000
+# Co najwyżej jedna migawka postępu na klatkę GUI
+EXPORT_PROGRESS_INTERVAL = 0.1
+
+EXPORT_FORMATS = ("csv", "ndjson", "json")
+EXPORT_COLUMNS = ("id", "timestamp", "vendor_id", "product_id", "action")
+CSV_HEADER = ("ID", "Timestamp", "VendorID", "ProductID", "Action")
+
+ExportFilters = namedtuple("ExportFilters", "since until vendor_id product_id action")
+ExportFilters.__new__.__defaults__ = (None,) * len(ExportFilters._fields)
+
+class ExportCancelled(Exception):
+    """Eksport przerwany przez użytkownika."""
+
+def default_export_path(fmt, compress=False):
+    name = f"log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return os.path.join(EXPORT_DIR, name + (".gz" if compress else ""))
+
+def _open_output(path, compress):
+    if compress:
+        return gzip.open(path, "wt", compresslevel=6, encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+class _CsvWriter:
+    def __init__(self, f):
+        self.writer = csv.writer(f)
+        self.writer.writerow(CSV_HEADER)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def finish(self):
+        pass
+
+class _NdjsonWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write_rows(self, rows):
+        self.f.write("".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows))
+
+    def finish(self):
+        pass
+
+class _JsonArrayWriter:
+    """Tablica JSON zapisywana przyrostowo - bez budowania listy wszystkich wierszy w pamięci."""
+
+    def __init__(self, f):
+        self.f = f
+        self.first = True
+        f.write("[")
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        chunk = ",\n    ".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) for row in rows)
+        self.f.write(("\n    " if self.first else ",\n    ") + chunk)
+        self.first = False
+
+    def finish(self):
+        self.f.write("]\n" if self.first else "\n]\n")
+
+_WRITERS = {"csv": _CsvWriter, "ndjson": _NdjsonWriter, "json": _JsonArrayWriter}
+
+def export_logs(path, fmt="csv", filters=None, compress=False, progress=None, cancel_event=None,
+                batch_size=EXPORT_BATCH_SIZE):
+    """
+    Strumieniowo eksportuje historię zdarzeń do pliku; zwraca liczbę zapisanych wierszy.
+
+    Wiersze są pobierane partiami przez fetchmany, więc zużycie pamięci nie
+    zależy od rozmiaru bazy. Plik powstaje pod nazwą tymczasową i jest
+    podmieniany dopiero po udanym zakończeniu. progress(done, total) jest
+    wywoływane co najwyżej raz na EXPORT_PROGRESS_INTERVAL.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    # Puste pola filtrów traktujemy jak brak filtra
+    criteria = {field: value or None for field, value in (filters or ExportFilters())._asdict().items()}
+    total = count_events(**criteria)
+    if not total:
+        return 0
+    cursor = query_events(**criteria, local_time=True)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = path + ".part"
+    done = 0
+    last_report = 0.0
+    try:
+        with _open_output(partial, compress) as f:
+            writer = _WRITERS[fmt](f)
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ExportCancelled()
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.write_rows(rows)
+                done += len(rows)
+                now = time.monotonic()
+                if progress and now - last_report >= EXPORT_PROGRESS_INTERVAL:
+                    last_report = now
+                    progress(done, total)
+            writer.finish()
+        os.replace(partial, path)
+    except BaseException:
+        cursor.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    if progress:
+        progress(done, total)
+    return done
+
+class ExportJob:
+    """
+    Eksport w wątku w tle; postęp i wynik trafiają do kolejki odczytywanej przez GUI.
+
+    Komunikaty: {"status": ..., "rows_done": n, "rows_total": m} oraz na końcu
+    {"done": True, "result": {"path", "rows", "elapsed", "error", "cancelled"}}.
+    """
+
+    def __init__(self, progress_queue, fmt="csv", filters=None, compress=False, path=None):
+        self.progress_queue = progress_queue
+        self.fmt = fmt
+        self.filters = filters
+        self.compress = compress
+        self.path = path or default_export_path(fmt, compress)
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="log-export", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _report(self, done, total):
+        self.progress_queue.put({"status": f"Exported {done:,}/{total:,} rows", "rows_done": done, "rows_total": total})
+
+    def _run(self):
+        result = {"path": self.path, "rows": 0, "elapsed": 0.0, "error": None, "cancelled": False}
+        start = time.perf_counter()
+        try:
+            result["rows"] = export_logs(self.path, self.fmt, self.filters, self.compress,
+                                         progress=self._report, cancel_event=self.cancel_event)
+            log.info(f"Exported {result['rows']} log rows to {self.path}")
+        except ExportCancelled:
+            result["cancelled"] = True
+            log.info("Log export cancelled")
+        except Exception as e:
+            result["error"] = str(e)
+            log.error(f"Log export failed: {e}")
+        finally:
+            result["elapsed"] = time.perf_counter() - start
+            close_connection()
+            self.progress_queue.put({"done": True, "result": result})
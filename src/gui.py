@@ -3,12 +3,9 @@
 import customtkinter as ctk
 import logging
 import os
-import sqlite3
 from threading import Thread
 from tkinter import messagebox, END
 from datetime import datetime
-import csv
-import json
 import subprocess
 import platform
 import time
@@ -27,13 +24,25 @@ except ImportError:
     pass
 
 from .usb_monitor import get_connected_devices, monitor_usb, set_alert_callback, alert_queue
-from .database import is_device_whitelisted, add_to_whitelist, remove_from_whitelist
-from .scanner import scan_device, get_mount_point
-from config import LOG_FILE, DB_FILE
+from .database import is_device_whitelisted, add_to_whitelist, remove_from_whitelist, get_whitelist, get_whitelist_version
+from .scanner import scan_device, get_mount_point, format_progress, ScannedFilesLogReader
+from .logger import LogTailer, get_ring_buffer_handler
+from .exporter import ExportJob, ExportFilters, EXPORT_FORMATS
+from config import LOG_FILE
 
 log = logging.getLogger('secure_usb.gui')
 
 class USBMonitorApp(ctk.CTk):
+    LOG_DISPLAY_LINES = 100
+    LOG_LEVELS = {"INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+    LOG_SOURCES = {
+        "All": None,
+        "Monitor": "secure_usb.monitor",
+        "Scanner": "secure_usb.scanner",
+        "Database": "secure_usb.database",
+        "GUI": "secure_usb.gui",
+    }
+
     def __init__(self):
         super().__init__()
         self.title("MacScan")
@@ -60,9 +69,21 @@ class USBMonitorApp(ctk.CTk):
         self.devices = set()
         self.unauthorized_device = None 
         self.device_checkboxes = {}
+        self.device_rows = {}
+        self.device_list_placeholder = None
         self.whitelist_checkboxes = {}
+        self.whitelist_rows = {}
+        self.whitelist_placeholder = None
+        self.whitelist_version_seen = None
+        self.log_tailer = LogTailer(LOG_FILE)
+        self.log_seq = 0
         self.scan_progress_queue = Queue()
+        self.scan_progress_determinate = False
+        self.scan_gui_time = 0.0
+        self.scan_gui_ticks = 0
         self.is_scanning = False
+        self.export_job = None
+        self.export_queue = Queue()
 
         self.setup_ui()
         set_alert_callback(self.process_alert)
@@ -122,6 +143,15 @@ class USBMonitorApp(ctk.CTk):
         self.tabview.add("Activity Log")
         self.tabview.add("Data Export")
         
+        self.log_filter_frame = ctk.CTkFrame(self.tabview.tab("Activity Log"), fg_color="transparent")
+        self.log_filter_frame.pack(fill="x", padx=5, pady=(5, 0))
+        self.log_level_menu = ctk.CTkOptionMenu(self.log_filter_frame, values=list(self.LOG_LEVELS), command=self.on_log_filter_changed, width=110)
+        self.log_level_menu.set("INFO")
+        self.log_level_menu.pack(side="left")
+        self.log_source_menu = ctk.CTkOptionMenu(self.log_filter_frame, values=list(self.LOG_SOURCES), command=self.on_log_filter_changed, width=130)
+        self.log_source_menu.set("All")
+        self.log_source_menu.pack(side="left", padx=(10, 0))
+
         self.log_text = ctk.CTkTextbox(self.tabview.tab("Activity Log"), font=("Menlo", 12), fg_color="#0F172A", text_color="#CBD5E1", wrap="none")
         self.log_text.pack(fill="both", expand=True, padx=5, pady=5)
         self.log_text.configure(state="disabled")
@@ -129,11 +159,39 @@ class USBMonitorApp(ctk.CTk):
         self.export_frame = ctk.CTkFrame(self.tabview.tab("Data Export"), fg_color="transparent")
         self.export_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
-        self.export_csv_button = ctk.CTkButton(self.export_frame, text="Export CSV", command=self.export_logs_csv, fg_color="#3B82F6", height=35)
-        self.export_csv_button.pack(pady=10, fill="x")
-        
-        self.export_json_button = ctk.CTkButton(self.export_frame, text="Export JSON", command=self.export_logs_json, fg_color="#3B82F6", height=35)
-        self.export_json_button.pack(pady=10, fill="x")
+        # Filtry eksportu (puste pole = bez filtra)
+        self.export_filter_frame = ctk.CTkFrame(self.export_frame, fg_color="transparent")
+        self.export_filter_frame.pack(fill="x")
+        self.export_filter_frame.grid_columnconfigure((1, 3), weight=1)
+        self.export_filter_entries = {}
+        filter_fields = [
+            ("since", "From", "YYYY-MM-DD HH:MM:SS"), ("until", "To", "YYYY-MM-DD HH:MM:SS"),
+            ("vendor_id", "Vendor ID", "0x0951"), ("product_id", "Product ID", "0x1666"),
+            ("action", "Action", "CONNECTED_AUTH"),
+        ]
+        for i, (field, label, placeholder) in enumerate(filter_fields):
+            row, column = divmod(i, 2)
+            ctk.CTkLabel(self.export_filter_frame, text=label, text_color="#94A3B8").grid(row=row, column=column * 2, padx=(0, 8), pady=4, sticky="w")
+            entry = ctk.CTkEntry(self.export_filter_frame, placeholder_text=placeholder)
+            entry.grid(row=row, column=column * 2 + 1, padx=(0, 15), pady=4, sticky="ew")
+            self.export_filter_entries[field] = entry
+
+        self.export_options_frame = ctk.CTkFrame(self.export_frame, fg_color="transparent")
+        self.export_options_frame.pack(fill="x", pady=10)
+        self.export_format_menu = ctk.CTkOptionMenu(self.export_options_frame, values=[fmt.upper() for fmt in EXPORT_FORMATS], width=110)
+        self.export_format_menu.set("CSV")
+        self.export_format_menu.pack(side="left")
+        self.export_gzip_checkbox = ctk.CTkCheckBox(self.export_options_frame, text="gzip")
+        self.export_gzip_checkbox.pack(side="left", padx=15)
+
+        self.export_button = ctk.CTkButton(self.export_frame, text="Export", command=self.start_export, fg_color="#3B82F6", height=35)
+        self.export_button.pack(pady=10, fill="x")
+
+        self.export_progress = ctk.CTkProgressBar(self.export_frame, height=8, progress_color="#3B82F6", fg_color="#334155")
+        self.export_progress.set(0)
+        self.export_progress.pack(fill="x", pady=(5, 5))
+        self.export_status_label = ctk.CTkLabel(self.export_frame, text="", text_color="#94A3B8")
+        self.export_status_label.pack(anchor="w")
         
         # Statystyki
         self.stats_frame = ctk.CTkFrame(self.right_frame, fg_color="#1E293B", corner_radius=6)
@@ -254,21 +312,41 @@ class USBMonitorApp(ctk.CTk):
     def update_log_display(self):
         if hasattr(self, 'log_text') and self.log_text.winfo_exists():
             try:
-                if os.path.exists(LOG_FILE):
-                    with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                        all_lines = f.readlines()[-100:]
-                    filtered_lines = [line for line in all_lines if any(level in line for level in ['INFO', 'WARNING', 'ERROR', 'CRITICAL'])]
-                    content = "".join(filtered_lines)
-                    
-                    if content.strip() != self.log_text.get("1.0", END).strip():
-                        self.log_text.configure(state="normal")
-                        self.log_text.delete("1.0", END)
-                        self.log_text.insert(END, content)
-                        self.log_text.see(END)
-                        self.log_text.configure(state="disabled")
+                ring_buffer = get_ring_buffer_handler()
+                if ring_buffer is not None:
+                    # Rekordy prosto z pamięci procesu - bez I/O i bez parsowania tekstu
+                    self.log_seq, entries = ring_buffer.records_since(
+                        self.log_seq,
+                        min_level=self.LOG_LEVELS[self.log_level_menu.get()],
+                        logger_name=self.LOG_SOURCES[self.log_source_menu.get()],
+                    )
+                    new_lines = [entry.message for entry in entries]
+                else:
+                    new_lines = [line for line in self.log_tailer.read_new_lines() if any(level in line for level in ['INFO', 'WARNING', 'ERROR', 'CRITICAL'])]
+                self.append_log_lines(new_lines)
             except Exception:
                 pass
 
+    def append_log_lines(self, new_lines):
+        if not new_lines:
+            return
+        self.log_text.configure(state="normal")
+        self.log_text.insert(END, "".join(line + "\n" for line in new_lines))
+        # Ograniczamy liczbę widocznych linii, usuwając najstarsze z góry
+        line_count = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if line_count > self.LOG_DISPLAY_LINES:
+            self.log_text.delete("1.0", f"{line_count - self.LOG_DISPLAY_LINES + 1}.0")
+        self.log_text.see(END)
+        self.log_text.configure(state="disabled")
+
+    def on_log_filter_changed(self, _value=None):
+        # Nowy filtr: renderujemy ponownie od początku bufora
+        self.log_seq = 0
+        self.log_text.configure(state="normal")
+        self.log_text.delete("1.0", END)
+        self.log_text.configure(state="disabled")
+        self.update_log_display()
+
     def process_alert(self, vendor_id, product_id, bsd_name, device_classes):
         self.after(0, self.alert_unauthorized, vendor_id, product_id, bsd_name, device_classes)
 
@@ -310,84 +388,135 @@ class USBMonitorApp(ctk.CTk):
         self.alert_label.pack(pady=(0, 10), before=self.header_frame)
 
     def redraw_device_list(self):
+        """
+        Synchronizuje wiersze z self.devices: tworzy tylko nowe wiersze, usuwa te,
+        których urządzenia zniknęły, i przestawia status tylko tam, gdzie się zmienił.
+        """
         if not hasattr(self, 'device_list_frame'):
             return
-            
-        checked_ids = self.get_selected_device_ids()
-        for widget in self.device_list_frame.winfo_children():
-            widget.destroy()
-        self.device_checkboxes = {}
+
+        current_devices = set(self.devices)
+
+        # Zaznaczenie przenosimy na nowy wiersz tego samego urządzenia (np. gdy pojawi się BSD Name)
+        checked_removed = set()
+        for row_key in [key for key in self.device_rows if key not in current_devices]:
+            row = self.device_rows.pop(row_key)
+            if row["var"].get() != "off":
+                checked_removed.add(row["var"].get())
+            row["frame"].destroy()
+            del self.device_checkboxes[row_key]
+
+        if not current_devices:
+            if self.device_list_placeholder is None:
+                self.device_list_placeholder = ctk.CTkLabel(self.device_list_frame, text="No devices connected", text_color="#64748B")
+                self.device_list_placeholder.pack(pady=10)
+            return
+        if self.device_list_placeholder is not None:
+            self.device_list_placeholder.destroy()
+            self.device_list_placeholder = None
+
+        sorted_devices = sorted(current_devices, key=lambda x: (x[0], x[1], x[2] or "", x[3], x[4]))
+        next_frame = None
+        for device in reversed(sorted_devices):
+            row = self.device_rows.get(device)
+            if row is None:
+                row = self.create_device_row(device, next_frame, checked_removed)
+                self.device_rows[device] = row
+                self.device_checkboxes[device] = row["var"]
+            self.update_device_row_status(device, row)
+            next_frame = row["frame"]
+
+    def create_device_row(self, device, before_frame=None, checked_ids=()):
+        vendor_id, product_id, bsd_name, device_name, classes_tuple = device
+        device_id_str = f"{vendor_id}:{product_id}"
+
+        row_frame = ctk.CTkFrame(self.device_list_frame, fg_color="transparent")
+        if before_frame is not None:
+            row_frame.pack(fill="x", pady=2, padx=5, before=before_frame)
+        else:
+            row_frame.pack(fill="x", pady=2, padx=5)
+        
+        checkbox_var = ctk.StringVar(value=device_id_str if device_id_str in checked_ids else "off")
+        checkbox = ctk.CTkCheckBox(row_frame, text="", variable=checkbox_var, onvalue=device_id_str, offvalue="off", width=20, border_width=2, fg_color="#3B82F6")
+        checkbox.pack(side="left", padx=(0, 10))
         
-        sorted_devices = sorted(list(self.devices), key=lambda x: (x[0], x[1]))
+        label_text = f"{device_id_str} ({device_name})"
+        for cls in classes_tuple:
+            label_text += f" [{cls}]"
         
-        if not sorted_devices:
-            ctk.CTkLabel(self.device_list_frame, text="No devices connected", text_color="#64748B").pack(pady=10)
+        name_label = ctk.CTkLabel(row_frame, text=label_text, text_color="#E2E8F0", font=("Helvetica", 13), anchor="w")
+        name_label.pack(side="left", fill="x", expand=True)
+        
+        status_label = ctk.CTkLabel(row_frame, text="", font=("Helvetica", 11, "bold"), anchor="e")
+        status_label.pack(side="right", padx=5)
 
-        for i, (vendor_id, product_id, bsd_name, device_name, classes_tuple) in enumerate(sorted_devices):
-            device_id_str = f"{vendor_id}:{product_id}"
-            is_ejected = (vendor_id, product_id) in self.ejected_devices
-            is_authorized = is_device_whitelisted(vendor_id, product_id)
-            
-            classes_list = list(classes_tuple)
-            
-            status_text = "Ejected" if is_ejected else ("Authorized" if is_authorized else "Unauthorized")
-            status_color = "#64748B" if is_ejected else ("#10B981" if is_authorized else "#EF4444")
+        return {"frame": row_frame, "var": checkbox_var, "name_label": name_label, "status_label": status_label, "status": None}
 
-            row_frame = ctk.CTkFrame(self.device_list_frame, fg_color="transparent")
-            row_frame.pack(fill="x", pady=2, padx=5)
-            
-            checkbox_var = ctk.StringVar(value=device_id_str if device_id_str in checked_ids else "off")
-            checkbox = ctk.CTkCheckBox(row_frame, text="", variable=checkbox_var, onvalue=device_id_str, offvalue="off", width=20, border_width=2, fg_color="#3B82F6")
-            checkbox.pack(side="left", padx=(0, 10))
-            self.device_checkboxes[device_id_str] = checkbox_var
-            
-            label_text = f"{device_id_str} ({device_name})"
-            for cls in classes_list:
-                label_text += f" [{cls}]"
-            
-            name_label = ctk.CTkLabel(row_frame, text=label_text, text_color="#E2E8F0" if not is_ejected else "#475569", font=("Helvetica", 13), anchor="w")
-            name_label.pack(side="left", fill="x", expand=True)
-            
-            status_label = ctk.CTkLabel(row_frame, text=status_text, text_color=status_color, font=("Helvetica", 11, "bold"), anchor="e")
-            status_label.pack(side="right", padx=5)
+    def update_device_row_status(self, device, row):
+        vendor_id, product_id = device[0], device[1]
+        is_ejected = (vendor_id, product_id) in self.ejected_devices
+        is_authorized = is_device_whitelisted(vendor_id, product_id)
+
+        status_text = "Ejected" if is_ejected else ("Authorized" if is_authorized else "Unauthorized")
+        if status_text == row["status"]:
+            return
+        row["status"] = status_text
+
+        status_color = "#64748B" if is_ejected else ("#10B981" if is_authorized else "#EF4444")
+        row["status_label"].configure(text=status_text, text_color=status_color)
+        row["name_label"].configure(text_color="#E2E8F0" if not is_ejected else "#475569")
 
     def redraw_whitelist_list(self):
+        """
+        Odświeża panel whitelisty tylko wtedy, gdy zmieniła się wersja whitelisty
+        (zapis w tym procesie lub w innym, np. z CLI) - i tylko zmienione wiersze.
+        """
         if not hasattr(self, 'whitelist_list_frame'):
             return
-            
-        checked_ids = self.get_selected_whitelist_ids()
-        for widget in self.whitelist_list_frame.winfo_children():
-            widget.destroy()
-        self.whitelist_checkboxes = {}
-        
-        whitelist_data = []
-        try:
-            conn = sqlite3.connect(DB_FILE)
-            whitelist_data = conn.execute("SELECT vendor_id, product_id, device_name FROM whitelist").fetchall()
-            conn.close()
-        except Exception:
-            whitelist_data = []
-            
+
+        version = get_whitelist_version()
+        if version is not None and version == self.whitelist_version_seen:
+            return
+        self.whitelist_version_seen = version
+
+        whitelist_data = {f"{row[0]}:{row[1]}": row[2] or "Unknown Device" for row in get_whitelist()}
+
+        for device_id_str in [key for key in self.whitelist_rows if key not in whitelist_data]:
+            self.whitelist_rows.pop(device_id_str)["frame"].destroy()
+            del self.whitelist_checkboxes[device_id_str]
+
         if not whitelist_data:
-            ctk.CTkLabel(self.whitelist_list_frame, text="Whitelist Empty", text_color="#64748B").pack(pady=10)
-            
-        for row in whitelist_data:
-            vendor_id = row[0]
-            product_id = row[1]
-            device_name = row[2] if len(row) > 2 and row[2] else "Unknown Device"
+            if self.whitelist_placeholder is None:
+                self.whitelist_placeholder = ctk.CTkLabel(self.whitelist_list_frame, text="Whitelist Empty", text_color="#64748B")
+                self.whitelist_placeholder.pack(pady=10)
+        elif self.whitelist_placeholder is not None:
+            self.whitelist_placeholder.destroy()
+            self.whitelist_placeholder = None
             
-            device_id_str = f"{vendor_id}:{product_id}"
+        for device_id_str, device_name in whitelist_data.items():
             display_text = f"{device_id_str} ({device_name})"
+            row = self.whitelist_rows.get(device_id_str)
+            if row is not None:
+                if row["text"] != display_text:
+                    row["label"].configure(text=display_text)
+                    row["text"] = display_text
+                continue
             
             row_frame = ctk.CTkFrame(self.whitelist_list_frame, fg_color="transparent")
             row_frame.pack(fill="x", pady=2, padx=5)
             
-            checkbox_var = ctk.StringVar(value=device_id_str if device_id_str in checked_ids else "off")
+            checkbox_var = ctk.StringVar(value="off")
             checkbox = ctk.CTkCheckBox(row_frame, text="", variable=checkbox_var, onvalue=device_id_str, offvalue="off", width=20, border_width=2, fg_color="#3B82F6")
             checkbox.pack(side="left", padx=(0, 10))
             self.whitelist_checkboxes[device_id_str] = checkbox_var
             
-            ctk.CTkLabel(row_frame, text=display_text, text_color="#10B981", font=("Helvetica", 13), anchor="w").pack(side="left", fill="x", expand=True)
+            label = ctk.CTkLabel(row_frame, text=display_text, text_color="#10B981", font=("Helvetica", 13), anchor="w")
+            label.pack(side="left", fill="x", expand=True)
+            self.whitelist_rows[device_id_str] = {"frame": row_frame, "label": label, "text": display_text}
+
+        # Status "Authorized/Unauthorized" na liście urządzeń zależy od whitelisty
+        for device, row in self.device_rows.items():
+            self.update_device_row_status(device, row)
 
     def start_eject_thread(self):
         selected_ids = self.get_selected_device_ids()
@@ -439,7 +568,8 @@ class USBMonitorApp(ctk.CTk):
             messagebox.showerror("Result", f"Failed to eject {failed_count} devices.")
 
     def get_selected_device_ids(self):
-        return [dev_id for dev_id, var in self.device_checkboxes.items() if var.get() != "off"]
+        # Kilka identycznych urządzeń (ten sam vendor:product) daje jeden identyfikator
+        return list(dict.fromkeys(var.get() for var in self.device_checkboxes.values() if var.get() != "off"))
 
     def get_selected_whitelist_ids(self):
         return [dev_id for dev_id, var in self.whitelist_checkboxes.items() if var.get() != "off"]
@@ -487,41 +617,60 @@ class USBMonitorApp(ctk.CTk):
             self.alert_unauthorized(*alert_queue.get())
         self.after(100, self.check_alert_queue)
 
-    def export_logs_csv(self):
-        try:
-            os.makedirs("logs/exports", exist_ok=True)
-            conn = sqlite3.connect(DB_FILE)
-            results = conn.execute("SELECT * FROM logs").fetchall()
-            conn.close()
-            
-            if not results:
-                return
-                
-            filename = f"logs/exports/log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                csv.writer(f).writerow(["ID", "Timestamp", "VendorID", "ProductID", "Action"])
-                csv.writer(f).writerows(results)
-            messagebox.showinfo("Saved", f"Log saved to: {filename}")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-        
-    def export_logs_json(self):
-        try:
-            os.makedirs("logs/exports", exist_ok=True)
-            conn = sqlite3.connect(DB_FILE)
-            conn.row_factory = sqlite3.Row
-            results = conn.execute("SELECT * FROM logs").fetchall()
-            conn.close()
-            
-            if not results:
-                return
-                
-            filename = f"logs/exports/log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump([dict(row) for row in results], f, indent=4)
-            messagebox.showinfo("Saved", f"Log saved to: {filename}")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+    def start_export(self):
+        if self.export_job is not None:
+            # Drugie kliknięcie w trakcie eksportu przerywa go
+            self.export_job.cancel()
+            return
+
+        filters = ExportFilters(**{field: entry.get().strip() or None for field, entry in self.export_filter_entries.items()})
+        self.export_queue = Queue()
+        self.export_job = ExportJob(
+            self.export_queue,
+            fmt=self.export_format_menu.get().lower(),
+            filters=filters,
+            compress=bool(self.export_gzip_checkbox.get()),
+        ).start()
+        self.export_button.configure(text="Cancel Export", fg_color="#EF4444")
+        self.export_progress.set(0)
+        self.export_status_label.configure(text="Exporting...")
+        self.process_export_queue()
+
+    def process_export_queue(self):
+        latest_status = None
+        final_message = None
+        while not self.export_queue.empty():
+            update = self.export_queue.get_nowait()
+            if "done" in update:
+                final_message = update
+                break
+            latest_status = update
+
+        if latest_status:
+            self.export_status_label.configure(text=latest_status["status"])
+            if latest_status["rows_total"]:
+                self.export_progress.set(latest_status["rows_done"] / latest_status["rows_total"])
+
+        if final_message:
+            self.finish_export(final_message["result"])
+        else:
+            self.after(100, self.process_export_queue)
+
+    def finish_export(self, result):
+        self.export_job = None
+        self.export_button.configure(text="Export", fg_color="#3B82F6")
+        if result["error"]:
+            self.export_status_label.configure(text="Export failed")
+            messagebox.showerror("Error", result["error"])
+        elif result["cancelled"]:
+            self.export_status_label.configure(text="Export cancelled")
+        elif not result["rows"]:
+            self.export_progress.set(0)
+            self.export_status_label.configure(text="No log entries match the filters")
+        else:
+            self.export_progress.set(1)
+            self.export_status_label.configure(text=f"Exported {result['rows']:,} rows in {result['elapsed']:.1f}s")
+            messagebox.showinfo("Saved", f"Log saved to: {result['path']}")
 
     def scan_selected_device(self):
         selected_ids = self.get_selected_device_ids()
@@ -540,6 +689,9 @@ class USBMonitorApp(ctk.CTk):
             return
             
         self.scan_progress_queue = Queue()
+        self.scan_progress_determinate = False
+        self.scan_gui_time = 0.0
+        self.scan_gui_ticks = 0
         self.is_scanning = True
         self.status_label.configure(text="Scanning...")
         self.progress.configure(mode="indeterminate")
@@ -553,27 +705,50 @@ class USBMonitorApp(ctk.CTk):
         self.scan_progress_queue.put({"done": True, "result": scan_result})
 
     def process_scan_queue(self):
+        tick_start = time.perf_counter()
         try:
             final_message = None
+            latest_status = None
             while not self.scan_progress_queue.empty():
                 update = self.scan_progress_queue.get_nowait()
                 if "done" in update:
                     final_message = update
                     break
                 elif "status" in update:
-                    self.status_label.configure(text=update["status"])
+                    # Rysujemy tylko najnowszą migawkę z tej klatki
+                    latest_status = update
+
+            if latest_status:
+                self.apply_scan_progress(latest_status)
                     
             if final_message:
+                self.record_scan_gui_time(tick_start)
                 self.show_scan_results(final_message["result"])
                 return
                 
             if self.is_scanning:
+                self.record_scan_gui_time(tick_start)
                 self.after(100, self.process_scan_queue)
         except Exception:
             self.show_scan_results({"error": "Queue processing error"})
 
+    def apply_scan_progress(self, update):
+        self.status_label.configure(text=format_progress(update))
+        if update.get("bytes_total"):
+            if not self.scan_progress_determinate:
+                # Pre-walk policzył sumy - przechodzimy na prawdziwy pasek postępu
+                self.scan_progress_determinate = True
+                self.progress.stop()
+                self.progress.configure(mode="determinate")
+            self.progress.set(min(update["bytes_done"] / update["bytes_total"], 1.0))
+
+    def record_scan_gui_time(self, tick_start):
+        self.scan_gui_time += time.perf_counter() - tick_start
+        self.scan_gui_ticks += 1
+
     def show_scan_results(self, scan_result):
         self.is_scanning = False
+        log.info(f"Scan progress handling on GUI thread: {self.scan_gui_time * 1000:.1f} ms over {self.scan_gui_ticks} ticks")
         self.progress.stop()
         self.progress.configure(mode="determinate")
         self.progress.set(1.0)
@@ -584,17 +759,19 @@ class USBMonitorApp(ctk.CTk):
             return
             
         if not scan_result.get("infected"):
-            self.show_clean_scan_dialog(scan_result.get("scanned_files", []))
+            self.show_clean_scan_dialog(scan_result.get("scanned_count", 0), scan_result.get("from_cache", 0), scan_result.get("scanned_files_log"))
         else:
             self.show_infected_scan_dialog(scan_result["infected"])
 
-    def show_clean_scan_dialog(self, scanned_files):
+    def show_clean_scan_dialog(self, scanned_count, from_cache=0, scanned_files_log=None):
         dialog = ctk.CTkToplevel(self)
         dialog.title("Scan Results")
-        dialog.geometry("400x150")
+        dialog.geometry("400x180")
         
-        ctk.CTkLabel(dialog, text="No Threats Found.", font=("Helvetica", 14, "bold"), text_color="#10B981").pack(pady=20)
-        ctk.CTkButton(dialog, text="Show Log", command=lambda: self.show_scanned_files_window(scanned_files)).pack(pady=10)
+        ctk.CTkLabel(dialog, text="No Threats Found.", font=("Helvetica", 14, "bold"), text_color="#10B981").pack(pady=(20, 5))
+        ctk.CTkLabel(dialog, text=f"Scanned: {scanned_count} | Unchanged (from cache): {from_cache}", font=("Helvetica", 12), text_color="#94A3B8").pack(pady=(0, 10))
+        if scanned_files_log:
+            ctk.CTkButton(dialog, text="Show Log", command=lambda: self.show_scanned_files_window(scanned_files_log)).pack(pady=10)
 
     def show_infected_scan_dialog(self, infected_files):
         dialog = ctk.CTkToplevel(self)
@@ -608,14 +785,67 @@ class USBMonitorApp(ctk.CTk):
         for file in infected_files:
             text_box.insert(END, f"{file['path']} ({file['signature']})\n")
 
-    def show_scanned_files_window(self, scanned_files):
-        window = ctk.CTkToplevel(self)
-        window.title("Scanned Files Log")
-        window.geometry("600x500")
-        
-        text_box = ctk.CTkTextbox(window, width=580, height=480)
-        text_box.pack(pady=10)
-        text_box.insert("1.0", "\n".join(scanned_files))
+    def show_scanned_files_window(self, scanned_files_log):
+        try:
+            reader = ScannedFilesLogReader(scanned_files_log)
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot open scan log: {e}")
+            return
+        ScannedFilesViewer(self, reader)
+
+class ScannedFilesViewer(ctk.CTkToplevel):
+    """Stronicowany podgląd logu skanu - w polu tekstowym jest tylko widoczne okno linii."""
+
+    PAGE_SIZE = 200
+    WHEEL_STEP = 20
+
+    def __init__(self, master, reader):
+        super().__init__(master)
+        self.reader = reader
+        self.first_line = 0
+        self.title("Scanned Files Log")
+        self.geometry("700x560")
+
+        self.text_box = ctk.CTkTextbox(self, width=680, height=460, wrap="none")
+        self.text_box.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+        self.text_box.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.text_box.bind("<Button-4>", lambda e: self.show_page(self.first_line - self.WHEEL_STEP))
+        self.text_box.bind("<Button-5>", lambda e: self.show_page(self.first_line + self.WHEEL_STEP))
+
+        nav_frame = ctk.CTkFrame(self, fg_color="transparent")
+        nav_frame.pack(fill="x", padx=10, pady=(0, 10))
+        ctk.CTkButton(nav_frame, text="< Prev", width=80, command=lambda: self.show_page(self.first_line - self.PAGE_SIZE)).pack(side="left")
+        ctk.CTkButton(nav_frame, text="Next >", width=80, command=lambda: self.show_page(self.first_line + self.PAGE_SIZE)).pack(side="left", padx=(10, 0))
+        self.position_label = ctk.CTkLabel(nav_frame, text="", text_color="#94A3B8")
+        self.position_label.pack(side="right")
+
+        self.slider = None
+        if len(reader) > self.PAGE_SIZE:
+            self.slider = ctk.CTkSlider(nav_frame, from_=0, to=len(reader) - self.PAGE_SIZE, command=lambda v: self.show_page(int(v)))
+            self.slider.pack(side="left", fill="x", expand=True, padx=10)
+
+        self.show_page(0)
+
+    def on_mouse_wheel(self, event):
+        step = -self.WHEEL_STEP if event.delta > 0 else self.WHEEL_STEP
+        self.show_page(self.first_line + step)
+        return "break"
+
+    def show_page(self, first_line):
+        total = len(self.reader)
+        first_line = max(0, min(first_line, total - self.PAGE_SIZE))
+        self.first_line = first_line
+        lines = self.reader.read_lines(first_line, self.PAGE_SIZE)
+
+        self.text_box.configure(state="normal")
+        self.text_box.delete("1.0", END)
+        self.text_box.insert("1.0", "\n".join(lines))
+        self.text_box.configure(state="disabled")
+
+        last_line = first_line + len(lines)
+        self.position_label.configure(text=f"{first_line + 1 if lines else 0}-{last_line} of {total}")
+        if self.slider is not None and int(self.slider.get()) != first_line:
+            self.slider.set(first_line)
 
 if __name__ == "__main__":
     app = USBMonitorApp()
@@ -1,14 +1,189 @@
 # src/logger.py
 
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from config import LOG_FILE
+import queue
+from collections import deque, namedtuple
+from datetime import datetime
+from itertools import islice
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from config import LOG_FILE, LOG_JSON_FILE, LOG_JSON_ENABLED
 
-def setup_logger():
-    """Initialize the logging system with levels and rotation."""
+LOG_BUFFER_CAPACITY = 2000
+
+LogEntry = namedtuple("LogEntry", "seq levelno name message")
+
+class RingBufferHandler(logging.Handler):
+    """
+    Trzyma w pamięci ostatnie `capacity` sformatowanych rekordów (INFO+)
+    z rosnącym numerem sekwencyjnym. GUI pyta o "rekordy od seq N",
+    bez czytania pliku i porównywania tekstu.
+    """
+
+    def __init__(self, capacity=LOG_BUFFER_CAPACITY, level=logging.INFO):
+        super().__init__(level)
+        self._entries = deque(maxlen=capacity)
+        self._last_seq = 0
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        # Handler.handle() trzyma self.lock podczas emit()
+        self._last_seq += 1
+        self._entries.append(LogEntry(self._last_seq, record.levelno, record.name, message))
+
+    @property
+    def last_seq(self):
+        return self._last_seq
+
+    def records_since(self, seq, min_level=logging.INFO, logger_name=None):
+        """
+        Zwraca (ostatni_seq, rekordy o seq > `seq`), opcjonalnie filtrowane po poziomie
+        i nazwie loggera ('secure_usb.monitor' pasuje też do jego potomków).
+        """
+        with self.lock:
+            last_seq = self._last_seq
+            first_seq = last_seq - len(self._entries) + 1
+            start = max(seq + 1 - first_seq, 0)
+            entries = list(islice(self._entries, start, None))
+        if min_level > logging.NOTSET:
+            entries = [e for e in entries if e.levelno >= min_level]
+        if logger_name:
+            prefix = logger_name + "."
+            entries = [e for e in entries if e.name == logger_name or e.name.startswith(prefix)]
+        return last_seq, entries
+
+class JsonLinesFormatter(logging.Formatter):
+    """Jeden obiekt JSON na linię - dla narzędzi, które nie powinny parsować formatu tekstowego."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class TracebackQueueHandler(QueueHandler):
+    """
+    QueueHandler.prepare() wkleja traceback do treści komunikatu i czyści exc_info/exc_text.
+    Ten wariant zostawia komunikat bez tracebacku i przekazuje gotowy exc_text, więc
+    handlery tekstowe dopisują go jak zwykle, a JSON zapisuje go w osobnym polu.
+    """
+
+    def prepare(self, record):
+        prepared = super().prepare(record)
+        if record.exc_text or record.stack_info:
+            # format() w super().prepare() ustawił na oryginale message i exc_text
+            prepared.msg = prepared.message = record.message
+            prepared.exc_text = record.exc_text
+            prepared.stack_info = record.stack_info
+        return prepared
+
+ring_buffer_handler = RingBufferHandler()
+_listener = None
+
+def get_ring_buffer_handler():
+    """Zwraca bufor rekordów dla GUI albo None, jeśli logger nie został skonfigurowany."""
+    if _listener is not None and ring_buffer_handler in _listener.handlers:
+        return ring_buffer_handler
+    return None
+
+def shutdown_logger():
+    """Zatrzymuje wątek listenera, zapisując wszystkie rekordy z kolejki."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+class LogTailer:
+    """
+    Czyta z pliku logu tylko bajty dopisane od ostatniego wywołania.
+    Pamięta otwarty deskryptor i inode, więc obsługuje rotację RotatingFileHandler:
+    dokańcza czytanie starego pliku (teraz *.1) i przechodzi na nowy od początku.
+    """
+
+    def __init__(self, path, initial_lines=100, initial_bytes=64 * 1024):
+        self.path = path
+        self.initial_lines = initial_lines
+        self.initial_bytes = initial_bytes
+        self._file = None
+        self._partial = b""
+
+    def _open(self, from_start):
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            self._file = None
+            return False
+        if not from_start:
+            # Pierwsze otwarcie: zaczynamy od ogona pliku, a nie od początku
+            size = os.fstat(self._file.fileno()).st_size
+            self._file.seek(max(size - self.initial_bytes, 0))
+            if size > self.initial_bytes:
+                self._file.readline()  # odrzuć uciętą pierwszą linię
+        return True
+
+    def _rotated(self):
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(self._file.fileno())
+        return current.st_ino != opened.st_ino or current.st_size < self._file.tell()
+
+    def _read_lines(self):
+        data = self._partial + self._file.read()
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        return [line.decode("utf-8", "replace") for line in lines]
+
+    def read_new_lines(self):
+        """Zwraca pełne linie dopisane od ostatniego wywołania."""
+        if self._file is None:
+            if not self._open(from_start=False):
+                return []
+            return self._read_lines()[-self.initial_lines:]
+
+        lines = self._read_lines()
+        if self._rotated():
+            lines += self._read_lines()
+            self._file.close()
+            self._partial = b""
+            if self._open(from_start=True):
+                lines += self._read_lines()
+        return lines
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def setup_logger(json_lines=None):
+    """
+    Initialize the logging system with levels and rotation.
+
+    Loggers only put records on a queue (QueueHandler); file, console, ring
+    buffer and optional JSON-lines output run on a dedicated listener thread,
+    so monitor/scanner/GUI threads never wait on file I/O.
+    """
+    global _listener
     try:
         os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+        shutdown_logger()
 
         log_formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -37,15 +212,36 @@ def setup_logger():
         console_handler.setLevel(logging.INFO) # Pokazuj w konsoli/GUI tylko INFO i ważniejsze
         # --- KONIEC ZMIANY ---
 
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        # Bufor w pamięci dla zakładki Activity Log (INFO+)
+        ring_buffer_handler.setFormatter(log_formatter)
+
+        handlers = [file_handler, console_handler, ring_buffer_handler]
+
+        # Opcjonalne wyjście strukturalne (JSON lines)
+        if LOG_JSON_ENABLED if json_lines is None else json_lines:
+            json_handler = RotatingFileHandler(
+                LOG_JSON_FILE, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8'
+            )
+            json_handler.setFormatter(JsonLinesFormatter())
+            json_handler.setLevel(logging.DEBUG)
+            handlers.append(json_handler)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = TracebackQueueHandler(log_queue)
+        queue_handler.setLevel(logging.DEBUG)
+        logger.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
 
         # Dodajemy informację o inicjalizacji PO dodaniu handlerów
-        logger.info("Logger initialized successfully (File: DEBUG+, Console: INFO+)")
+        logger.info(f"Logger initialized successfully (File: DEBUG+, Console: INFO+, JSON: {len(handlers) > 3})")
 
     except Exception as e:
         # Użyj print, bo logger mógł się nie zainicjować
         print(f"Failed to initialize logger: {e}")
         # Można też spróbować zalogować do root loggera jako ostateczność
         logging.exception("Failed to initialize application logger")
-        raise
\ No newline at end of file
+        raise
+
+atexit.register(shutdown_logger)
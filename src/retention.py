@@ -0,0 +1,173 @@
+import logging
+import sqlite3
+import threading
+import time
+from config import EVENT_RETENTION_DAYS, RETENTION_INTERVAL
+from .database import get_connection, close_connection, is_incremental_vacuum_enabled
+
+log = logging.getLogger('secure_usb.retention')
+
+# Jedna partia = jedna krótka transakcja; między partiami monitor/EventWriter dostaje blokadę zapisu
+RETENTION_BATCH_SIZE = 1000
+RETENTION_BATCH_PAUSE = 0.02
+# incremental_vacuum oddaje wolne strony porcjami, też z przerwami
+VACUUM_STEP_PAGES = 256
+
+_SQL_BATCH_END = "SELECT ts FROM events WHERE ts < ? ORDER BY ts LIMIT 1 OFFSET ?"
+_SQL_ROLLUP_HOURLY = """
+    INSERT INTO event_counts_hourly (ts, device_id, action, count)
+    SELECT ts - ts % 3600, COALESCE(device_id, 0), action, COUNT(*)
+    FROM events WHERE ts <= ? GROUP BY 1, 2, 3
+    ON CONFLICT (ts, device_id, action) DO UPDATE SET count = count + excluded.count
+"""
+_SQL_ROLLUP_DAILY = """
+    INSERT INTO event_counts_daily (ts, device_id, action, count)
+    SELECT CAST(strftime('%s', date(ts, 'unixepoch', 'localtime'), 'utc') AS INTEGER),
+           COALESCE(device_id, 0), action, COUNT(*)
+    FROM events WHERE ts <= ? GROUP BY 1, 2, 3
+    ON CONFLICT (ts, device_id, action) DO UPDATE SET count = count + excluded.count
+"""
+_SQL_DELETE_ROLLED_UP = "DELETE FROM events WHERE ts <= ?"
+
+def get_db_size(conn):
+    """Rozmiar logiczny bazy i liczba wolnych stron: (bajty, strony_na_liście_wolnych)."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_size * page_count, freelist
+
+class RetentionEngine:
+    """
+    Okresowe sprzątanie historii zdarzeń.
+
+    Surowe zdarzenia starsze niż `retention_days` są zwijane do liczników
+    godzinowych i dziennych (event_counts_hourly/daily), a następnie usuwane
+    partiami po `batch_size` wierszy - każda partia to osobna, krótka
+    transakcja, więc zapisy monitora czekają co najwyżej na jedną partię.
+    Zwolnione strony wracają do systemu przez PRAGMA incremental_vacuum.
+    Bazy sprzed trybu auto_vacuum=INCREMENTAL wymagają jednorazowej konwersji
+    (`python main.py --enable-incremental-vacuum` przy zatrzymanym monitorze);
+    do tego czasu wolne strony są tylko ponownie używane przez SQLite.
+    """
+
+    def __init__(self, retention_days=EVENT_RETENTION_DAYS, interval=RETENTION_INTERVAL,
+                 batch_size=RETENTION_BATCH_SIZE, batch_pause=RETENTION_BATCH_PAUSE,
+                 vacuum_step_pages=VACUUM_STEP_PAGES):
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_step_pages = vacuum_step_pages
+        self.last_report = None
+        self._conversion_hint_logged = False
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running() or not self.retention_days:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="event-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Przerywa bieżący przebieg po aktualnej partii i zatrzymuje wątek."""
+        if not self.is_running():
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except sqlite3.Error as e:
+                    log.error(f"Retention run failed: {e}")
+                self._stop_event.wait(self.interval)
+        finally:
+            close_connection()
+
+    def run_once(self, now=None):
+        """Jeden przebieg retencji; zwraca raport z rozmiarem bazy i czasami etapów."""
+        conn = get_connection()
+        started = time.perf_counter()
+        size_before, _ = get_db_size(conn)
+        cutoff = int(now if now is not None else time.time()) - self.retention_days * 86400
+
+        rolled_up, batches = self._roll_up(conn, cutoff)
+        rollup_done = time.perf_counter()
+        # Bez trybu INCREMENTAL pragma nic nie zwalnia - pełny VACUUM nie działa tu automatycznie
+        if is_incremental_vacuum_enabled(conn):
+            freed_pages = self._vacuum(conn)
+        else:
+            freed_pages = 0
+            if not self._conversion_hint_logged:
+                log.info("Database is not in incremental auto-vacuum mode, freed pages stay in the file; "
+                         "convert it once with `python main.py --enable-incremental-vacuum` while the monitor is stopped")
+                self._conversion_hint_logged = True
+        finished = time.perf_counter()
+
+        size_after, freelist = get_db_size(conn)
+        report = {
+            "rolled_up": rolled_up,
+            "batches": batches,
+            "freed_pages": freed_pages,
+            "freelist_pages": freelist,
+            "size_before": size_before,
+            "size_after": size_after,
+            "rollup_ms": round((rollup_done - started) * 1000, 1),
+            "vacuum_ms": round((finished - rollup_done) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1),
+        }
+        self.last_report = report
+        log.info(
+            f"Retention: rolled up {rolled_up} events in {batches} batches ({report['rollup_ms']} ms), "
+            f"freed {freed_pages} pages ({report['vacuum_ms']} ms), "
+            f"DB size {size_before / 1048576:.1f} -> {size_after / 1048576:.1f} MiB"
+        )
+        return report
+
+    def _roll_up(self, conn, cutoff):
+        rolled_up = batches = 0
+        while not self._stop_event.is_set():
+            row = conn.execute(_SQL_BATCH_END, (cutoff, self.batch_size)).fetchone()
+            # Granica partii włącznie - postęp także przy wielu zdarzeniach z tym samym ts
+            batch_end = row[0] if row else cutoff - 1
+            with conn:
+                conn.execute(_SQL_ROLLUP_HOURLY, (batch_end,))
+                conn.execute(_SQL_ROLLUP_DAILY, (batch_end,))
+                deleted = conn.execute(_SQL_DELETE_ROLLED_UP, (batch_end,)).rowcount
+            if deleted:
+                rolled_up += deleted
+                batches += 1
+            if row is None:
+                break
+            time.sleep(self.batch_pause)
+        return rolled_up, batches
+
+    def _vacuum(self, conn):
+        freed = 0
+        while not self._stop_event.is_set():
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not freelist:
+                break
+            # execute() robi tylko jeden krok pragmy (= jedna strona); executescript wykonuje ją do końca
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_step_pages})")
+            freed += freelist - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            time.sleep(self.batch_pause)
+        # Bez blokowania: przeniesienie skróconej bazy z WAL do pliku, o ile nikt nie czyta
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        return freed
+
+retention_engine = RetentionEngine()
+
+def start_retention():
+    """Start the periodic retention thread (no-op when retention is disabled)."""
+    retention_engine.start()
+
+def stop_retention():
+    retention_engine.stop()
@@ -6,16 +6,126 @@ import plistlib
 import time
 import re
 import shutil
+import select
+import socket
+import struct
+import threading
+import queue
+import tempfile
+import hashlib
+import mmap
+from array import array
+from config import CLAMD_SOCKET, SCAN_WORKERS, CLAMSCAN_WORKERS, SCAN_CACHE_ENABLED, SCAN_LOG_DIR
+from .database import get_scan_verdict, store_scan_verdicts, close_connection, VERDICT_CLEAN, VERDICT_INFECTED
 
 log = logging.getLogger('secure_usb.scanner')
 
+PROC_MOUNTINFO = "/proc/self/mountinfo"
+SYS_CLASS_BLOCK = "/sys/class/block"
+
+# Typowe lokalizacje gniazda clamd (Debian/Ubuntu, Fedora, Homebrew)
+CLAMD_SOCKET_PATHS = [
+    "/var/run/clamav/clamd.ctl",
+    "/run/clamav/clamd.ctl",
+    "/run/clamd.scan/clamd.sock",
+    "/tmp/clamd.socket",
+    "/opt/homebrew/var/run/clamav/clamd.sock",
+    "/usr/local/var/run/clamav/clamd.sock",
+]
+CLAMD_CHUNK_SIZE = 64 * 1024
+CLAMD_TIMEOUT = 120
+# Docelowa wielkość jednostki pracy przy skanowaniu równoległym
+SCAN_UNIT_BYTES = 32 * 1024 * 1024
+SCAN_UNIT_FILES = 64
+# Maksymalnie jedna migawka postępu na klatkę GUI (process_scan_queue co 100 ms)
+PROGRESS_FRAME_INTERVAL = 0.1
+SCAN_LOG_KEEP = 20
+SCAN_LOG_BUFFER_SIZE = 256 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+HASH_MMAP_THRESHOLD = 8 * 1024 * 1024
+
+def _unescape_mountinfo(field):
+    """mountinfo koduje spacje itp. jako sekwencje ósemkowe, np. '\\040'."""
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+class MountInfoIndex:
+    """
+    Linux: indeks urządzenie blokowe -> punkty montowania zbudowany z /proc/self/mountinfo.
+    Indeks jest przebudowywany tylko wtedy, gdy jądro zasygnalizuje zmianę
+    tablicy montowań (POLLPRI/POLLERR na otwartym pliku mountinfo).
+    """
+
+    def __init__(self, mountinfo_path=PROC_MOUNTINFO, sys_class_block=SYS_CLASS_BLOCK):
+        self.mountinfo_path = mountinfo_path
+        self.sys_class_block = sys_class_block
+        self._index = None
+        self._file = None
+        self._poller = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        self._file = open(self.mountinfo_path, "rb")
+        if hasattr(select, "poll"):
+            self._poller = select.poll()
+            self._poller.register(self._file.fileno(), select.POLLPRI | select.POLLERR)
+
+    def _has_changed(self):
+        if self._index is None or self._poller is None:
+            return True
+        return bool(self._poller.poll(0))
+
+    def _parent_disk(self, block_name):
+        """Dla partycji (np. sdb1) zwraca nazwę dysku (sdb), w przeciwnym razie None."""
+        partition_dir = os.path.join(self.sys_class_block, block_name)
+        if not os.path.exists(os.path.join(partition_dir, "partition")):
+            return None
+        return os.path.basename(os.path.dirname(os.path.realpath(partition_dir)))
+
+    def _rebuild(self):
+        # Ponowny odczyt z tego samego deskryptora kasuje sygnał zmiany
+        self._file.seek(0)
+        content = self._file.read().decode("utf-8", "replace")
+        index = {}
+        for line in content.splitlines():
+            fields = line.split()
+            try:
+                separator = fields.index("-")
+                mount_point = _unescape_mountinfo(fields[4])
+                source = fields[separator + 2]
+            except (ValueError, IndexError):
+                continue
+            if not source.startswith("/dev/"):
+                continue
+            block_name = os.path.basename(source)
+            index.setdefault(block_name, []).append(mount_point)
+            parent = self._parent_disk(block_name)
+            if parent:
+                index.setdefault(parent, []).append(mount_point)
+        self._index = index
+        log.debug(f"Przebudowano indeks mountinfo ({len(index)} urządzeń)")
+
+    def lookup(self, block_name):
+        """Zwraca listę punktów montowania dla dysku lub partycji (np. 'sdb', '/dev/sdb1')."""
+        with self._lock:
+            if self._file is None:
+                self._open()
+            if self._has_changed():
+                self._rebuild()
+            return list(self._index.get(os.path.basename(block_name), []))
+
+mount_info_index = MountInfoIndex()
+
 def get_mount_point(bsd_name_from_usb_monitor):
     """
-    Pobiera punkt montowania dla danego urządzenia na macOS.
+    Pobiera punkt montowania dla danego urządzenia (macOS: diskutil, Linux: mountinfo).
     Obsługuje zarówno dyski z partycjami, jak i woluminy bezpośrednie (whole disk).
     """
-    if platform.system() != "Darwin" or not bsd_name_from_usb_monitor:
-        log.warning("Funkcja get_mount_point jest obecnie zaimplementowana tylko dla macOS.")
+    if not bsd_name_from_usb_monitor:
+        return None
+    if platform.system() == "Linux":
+        return _get_mount_point_linux(bsd_name_from_usb_monitor)
+    if platform.system() != "Darwin":
+        log.warning("Funkcja get_mount_point jest zaimplementowana tylko dla macOS i Linuksa.")
         return None
     try:
         # Pobieramy strukturę wszystkich dysków
@@ -53,6 +163,121 @@ def get_mount_point(bsd_name_from_usb_monitor):
         log.error(f"Błąd podczas szukania punktu montowania: {e}")
         return None
 
+def _get_mount_point_linux(block_name):
+    try:
+        for mount_point in mount_info_index.lookup(block_name):
+            if os.path.exists(mount_point):
+                return mount_point
+    except Exception as e:
+        log.error(f"Błąd podczas szukania punktu montowania: {e}")
+    return None
+
+class ClamdError(Exception):
+    """Błąd protokołu lub połączenia z demonem clamd."""
+
+class ClamdClient:
+    """
+    Minimalny klient demona clamd przez lokalne gniazdo UNIX.
+    Pliki są przesyłane komendą INSTREAM w porcjach, więc clamd nie musi
+    mieć uprawnień do odczytu punktu montowania.
+    """
+
+    def __init__(self, socket_path, timeout=CLAMD_TIMEOUT, chunk_size=CLAMD_CHUNK_SIZE):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise ClamdError(f"Nie można połączyć się z {self.socket_path}: {e}") from e
+        return sock
+
+    @staticmethod
+    def _read_reply(sock):
+        # Komendy z prefiksem "z" kończą odpowiedź bajtem NUL
+        chunks = []
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            chunks.append(data)
+            if data.endswith(b"\0"):
+                break
+        return b"".join(chunks).rstrip(b"\0").decode("utf-8", "replace").strip()
+
+    def _command(self, command):
+        with self._connect() as sock:
+            try:
+                sock.sendall(b"z" + command + b"\0")
+                return self._read_reply(sock)
+            except OSError as e:
+                raise ClamdError(str(e)) from e
+
+    def ping(self):
+        return self._command(b"PING") == "PONG"
+
+    def version(self):
+        return self._command(b"VERSION")
+
+    @staticmethod
+    def parse_reply(reply):
+        """'stream: Eicar-Signature FOUND' -> ('FOUND', 'Eicar-Signature'); 'stream: OK' -> ('OK', None)."""
+        _, _, result = reply.partition(": ")
+        result = result or reply
+        if result.endswith(" FOUND"):
+            return "FOUND", result[:-len(" FOUND")]
+        if result.endswith(" ERROR"):
+            return "ERROR", result[:-len(" ERROR")]
+        if result == "OK":
+            return "OK", None
+        return "ERROR", reply
+
+    def scan_file(self, file_path, digest=None):
+        """
+        Przesyła plik przez INSTREAM; zwraca (status, sygnatura_lub_komunikat).
+        Podany obiekt hashlib dostaje dokładnie te bajty, które trafiły do clamd.
+        """
+        with open(file_path, "rb") as f, self._connect() as sock:
+            try:
+                sock.sendall(b"zINSTREAM\0")
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if digest is not None:
+                        digest.update(chunk)
+                    sock.sendall(struct.pack("!L", len(chunk)) + chunk)
+                sock.sendall(struct.pack("!L", 0))
+            except (BrokenPipeError, ConnectionResetError):
+                # clamd zamyka połączenie po przekroczeniu StreamMaxLength - odpowiedź jest w buforze
+                pass
+            except OSError as e:
+                raise ClamdError(str(e)) from e
+            try:
+                return self.parse_reply(self._read_reply(sock))
+            except OSError as e:
+                raise ClamdError(str(e)) from e
+
+def find_clamd():
+    """Zwraca klienta działającego demona clamd albo None (fallback na clamscan)."""
+    candidates = [CLAMD_SOCKET] if CLAMD_SOCKET else CLAMD_SOCKET_PATHS
+    for socket_path in candidates:
+        if not os.path.exists(socket_path):
+            continue
+        client = ClamdClient(socket_path)
+        try:
+            if client.ping():
+                log.debug(f"Znaleziono clamd: {socket_path}")
+                return client
+        except ClamdError as e:
+            log.debug(f"clamd pod {socket_path} nie odpowiada: {e}")
+    return None
+
 def get_clamscan_path():
     """
     Automatycznie wykrywa ścieżkę do pliku wykonywalnego clamscan.
@@ -85,34 +310,582 @@ def format_time(seconds):
     seconds = int(seconds % 60)
     return f"{minutes} min {seconds} s"
 
-def scan_device(mount_point, progress_queue=None):
+def format_progress(update):
+    """Buduje tekst paska stanu z migawki postępu (pliki, przepustowość, ETA)."""
+    parts = [update.get("status", "")]
+    if update.get("files_total") is not None:
+        parts.append(f"{update['files_done']}/{update['files_total']} plików")
+    if update.get("throughput"):
+        parts.append(f"{update['throughput'] / (1024 * 1024):.1f} MB/s")
+    if update.get("eta") is not None:
+        parts.append(f"ETA: {format_time(update['eta'])}")
+    return " | ".join(part for part in parts if part)
+
+def get_signature_version(clamd_client):
+    """
+    Zwraca wersję silnika i bazy sygnatur demona clamd, np. '1.0.0/27000'
+    (z 'ClamAV 1.0.0/27000/Thu Jan  1 00:00:00 2026').
+    """
+    try:
+        version = clamd_client.version()
+    except ClamdError as e:
+        log.warning(f"Nie udało się odczytać wersji ClamAV: {e}")
+        return None
+    parts = version.split("/")
+    if len(parts) < 2 or not parts[0].startswith("ClamAV "):
+        return None
+    return f"{parts[0][len('ClamAV '):]}/{parts[1]}"
+
+def hash_file(file_path):
+    """SHA-256 pliku; duże pliki przez mmap, mniejsze dużymi buforowanymi odczytami."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= HASH_MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    return digest.hexdigest()
+
+class VerdictCache:
+    """
+    Trwały cache werdyktów: (hash, rozmiar, mtime, wersja sygnatur) -> clean/infected.
+    Jedna instancja na wątek (połączenie SQLite jest per wątek); nowe werdykty
+    są zapisywane zbiorczo w close().
+    """
+
+    def __init__(self, signature_version):
+        self.signature_version = signature_version
+        self._pending = []
+
+    def lookup(self, file_path):
+        """
+        Zwraca (klucz, werdykt lub None). Hash z tego odczytu służy tylko do wyszukania -
+        werdykt zapisuje się pod kluczem z with_hash() policzonym z bajtów faktycznie
+        przeskanowanych, bo urządzenie może przy kolejnym odczycie oddać inną treść.
+        """
+        try:
+            stat = os.stat(file_path)
+            key = (hash_file(file_path), stat.st_size, stat.st_mtime_ns, self.signature_version)
+        except (OSError, ValueError):
+            return None, None
+        return key, get_scan_verdict(*key)
+
+    @staticmethod
+    def with_hash(key, file_hash):
+        return (file_hash,) + key[1:] if key else None
+
+    def record(self, key, verdict):
+        if key:
+            self._pending.append(key + (verdict,))
+
+    def close(self):
+        if self._pending:
+            store_scan_verdicts(self._pending)
+            self._pending = []
+        close_connection()
+
+class ScannedFilesLog:
+    """
+    Dopisywany strumieniowo plik z listą przeskanowanych ścieżek (jedna na linię),
+    dzięki czemu w pamięci trzymamy tylko liczniki, a nie listę wszystkich plików.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8", errors="surrogateescape", buffering=SCAN_LOG_BUFFER_SIZE)
+
+    @classmethod
+    def create(cls, log_dir=None):
+        log_dir = log_dir or SCAN_LOG_DIR
+        os.makedirs(log_dir, exist_ok=True)
+        _prune_scan_logs(log_dir)
+        name = f"scan_{time.strftime('%Y%m%d_%H%M%S')}_{time.time_ns() // 1_000_000 % 1000:03d}_{os.getpid()}.log"
+        return cls(os.path.join(log_dir, name))
+
+    def write(self, file_path):
+        # Nowa linia w nazwie pliku rozbiłaby indeks linii przeglądarki
+        line = file_path.replace("\n", "\\n") + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def _prune_scan_logs(log_dir, keep=SCAN_LOG_KEEP):
+    """Usuwa najstarsze logi skanów, zostawiając `keep` najnowszych."""
+    try:
+        logs = sorted(
+            (entry for entry in os.scandir(log_dir) if entry.name.startswith("scan_") and entry.name.endswith(".log")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+    except OSError:
+        return
+    for entry in logs[:max(len(logs) - keep + 1, 0)]:
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
+
+class ScannedFilesLogReader:
+    """
+    Odczyt logu przeskanowanych plików stronami: indeks offsetów linii
+    budowany jednym przejściem, potem wczytujemy tylko widoczne okno linii.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = array("Q", [0])
+        with open(path, "rb") as f:
+            position = 0
+            for line in f:
+                position += len(line)
+                self._offsets.append(position)
+        self._offsets.pop()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def read_lines(self, start, count):
+        if start >= len(self._offsets) or count <= 0:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[start])
+            lines = []
+            for _ in range(min(count, len(self._offsets) - start)):
+                lines.append(f.readline().decode("utf-8", "replace").rstrip("\n"))
+            return lines
+
+class ScanProgress:
+    """
+    Wspólny licznik postępu dla wątków skanujących; publikuje statusy do kolejki GUI.
+    Sumy plików/bajtów pochodzą z szybkiego pre-walku (os.scandir) działającego
+    równolegle ze skanowaniem, więc nie opóźnia on pierwszego skanowanego pliku.
+    """
+
+    def __init__(self, progress_queue=None, scanned_files_log=None):
+        self.progress_queue = progress_queue
+        self.scanned_files_log = scanned_files_log
+        self.scanned_count = 0
+        self.bytes_done = 0
+        self.files_total = None
+        self.bytes_total = None
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._prewalk_stop = threading.Event()
+
+    def start_prewalk(self, mount_point):
+        threading.Thread(target=self._prewalk, args=(mount_point,), name="scan-prewalk", daemon=True).start()
+
+    def stop_prewalk(self):
+        self._prewalk_stop.set()
+
+    def _prewalk(self, mount_point):
+        files_total = 0
+        bytes_total = 0
+        for _, size in iter_files(mount_point):
+            if self._prewalk_stop.is_set():
+                return
+            files_total += 1
+            bytes_total += size
+        self.set_totals(files_total, bytes_total)
+        log.debug(f"Pre-walk: {files_total} plików, {bytes_total} bajtów")
+
+    def set_totals(self, files_total, bytes_total):
+        with self._lock:
+            self.files_total = files_total
+            self.bytes_total = bytes_total
+
+    def _advance(self, file_path, size):
+        if size is None:
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+        with self._lock:
+            self.scanned_count += 1
+            self.bytes_done += size
+            return self._snapshot()
+
+    def _snapshot(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        throughput = self.bytes_done / elapsed
+        eta = None
+        if self.bytes_total is not None and throughput > 0:
+            eta = max(self.bytes_total - self.bytes_done, 0) / throughput
+        return {
+            "files_done": self.scanned_count,
+            "files_total": self.files_total,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.bytes_total,
+            "throughput": throughput,
+            "eta": eta,
+        }
+
+    def _publish(self, snapshot, status):
+        if self.progress_queue:
+            snapshot["status"] = status
+            self.progress_queue.put(snapshot)
+
+    def file_scanned(self, partial_result, file_path, size=None):
+        snapshot = self._advance(file_path, size)
+        partial_result["scanned_count"] += 1
+        if self.scanned_files_log:
+            self.scanned_files_log.write(file_path)
+        self._publish(snapshot, f"Skanowanie pliku #{snapshot['files_done']}: {os.path.basename(file_path)}")
+
+    def file_cached(self, partial_result, file_path, size=None):
+        snapshot = self._advance(file_path, size)
+        partial_result["from_cache"] += 1
+        self._publish(snapshot, f"Pominięto (cache) plik #{snapshot['files_done']}: {os.path.basename(file_path)}")
+
+class ProgressAggregator:
+    """
+    Pośrednik między skanerem a kolejką GUI: łączy komunikaty postępu w migawki
+    i wysyła co najwyżej jedną na `interval` sekund (zawsze najnowszą).
+    Zaległą migawkę wysyła jeden wątek na cały skan, uruchamiany przy pierwszej potrzebie.
+    Komunikaty końcowe (done, błędy) są przekazywane zawsze, po opróżnieniu zaległej migawki.
+    """
+
+    def __init__(self, target_queue, interval=PROGRESS_FRAME_INTERVAL):
+        self.target_queue = target_queue
+        self.interval = interval
+        self.received = 0
+        self.emitted = 0
+        self._pending = None
+        self._last_emit = 0.0
+        self._flusher = None
+        self._stopping = False
+        self._cond = threading.Condition()
+
+    def put(self, message):
+        if "status" not in message or "done" in message:
+            self.flush()
+            with self._cond:
+                self._emit(message)
+            return
+        with self._cond:
+            self.received += 1
+            self._pending = message
+            if time.monotonic() < self._last_emit + self.interval:
+                # Dostarczymy najnowszą migawkę po upływie okna, nawet jeśli skaner ucichnie
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="scan-progress", daemon=True)
+                    self._flusher.start()
+                else:
+                    self._cond.notify()
+                return
+            self._emit_pending()
+
+    def flush(self):
+        """Wysyła zaległą migawkę od razu i zatrzymuje wątek wysyłający."""
+        with self._cond:
+            flusher, self._flusher = self._flusher, None
+            self._stopping = flusher is not None
+            self._cond.notify()
+        if flusher is not None:
+            flusher.join()
+        with self._cond:
+            self._stopping = False
+            if self._pending is not None:
+                self._emit_pending()
+
+    def _flush_loop(self):
+        with self._cond:
+            while not self._stopping:
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                delay = self._last_emit + self.interval - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self._emit_pending()
+
+    def _emit_pending(self):
+        message, self._pending = self._pending, None
+        self._last_emit = time.monotonic()
+        self._emit(message)
+
+    def _emit(self, message):
+        # Wywoływane pod self._cond - migawki i komunikat końcowy nie mijają się w kolejce
+        self.emitted += 1
+        self.target_queue.put(message)
+
+def _new_scan_result():
+    return {"infected": [], "warnings": [], "error": None, "scanned_count": 0, "from_cache": 0, "scanned_files_log": None}
+
+def merge_scan_results(scan_result, partial_result):
+    """Scala wynik jednego workera do wspólnego scan_result."""
+    known_paths = {d['path'] for d in scan_result["infected"]}
+    for infected in partial_result["infected"]:
+        if infected['path'] not in known_paths:
+            scan_result["infected"].append(infected)
+            known_paths.add(infected['path'])
+    scan_result["warnings"].extend(partial_result["warnings"])
+    scan_result["scanned_count"] += partial_result["scanned_count"]
+    scan_result["from_cache"] += partial_result["from_cache"]
+    if partial_result["error"] and not scan_result["error"]:
+        scan_result["error"] = partial_result["error"]
+    return scan_result
+
+def iter_files(mount_point):
+    """Rekursywnie zwraca (ścieżka, rozmiar) zwykłych plików; nie podąża za dowiązaniami."""
+    stack = [mount_point]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            log.warning(f"Nie można odczytać katalogu {directory}: {e}")
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+def iter_work_units(files, max_unit_bytes=SCAN_UNIT_BYTES, max_unit_files=SCAN_UNIT_FILES):
+    """
+    Grupuje pliki w jednostki pracy (listy (ścieżka, rozmiar)) o zbliżonym rozmiarze w bajtach
+    (duży plik tworzy własną jednostkę), generowane strumieniowo w trakcie przechodzenia drzewa.
+    """
+    unit, unit_bytes = [], 0
+    for file_path, size in files:
+        if unit and (unit_bytes + size > max_unit_bytes or len(unit) >= max_unit_files):
+            yield unit
+            unit, unit_bytes = [], 0
+        unit.append((file_path, size))
+        unit_bytes += size
+    if unit:
+        yield unit
+
+def partition_by_size(files, workers):
+    """Dzieli pliki na `workers` koszyków o zbliżonej sumie bajtów (największe pliki najpierw)."""
+    bins = [[] for _ in range(workers)]
+    bin_sizes = [0] * workers
+    for file_path, size in sorted(files, key=lambda item: item[1], reverse=True):
+        smallest = bin_sizes.index(min(bin_sizes))
+        bins[smallest].append(file_path)
+        bin_sizes[smallest] += size
+    return [b for b in bins if b]
+
+def scan_device(mount_point, progress_queue=None, engine="auto", workers=None, use_cache=None):
     """
     Skanuje rekursywnie, raportuje postęp przez kolejkę w trybie strumieniowym.
+    engine: "auto" (clamd, jeśli działa, w przeciwnym razie clamscan), "clamd" lub "clamscan".
+    workers: liczba równoległych workerów (domyślnie SCAN_WORKERS połączeń z clamd
+    albo CLAMSCAN_WORKERS procesów clamscan z config.py).
+    use_cache: pomijanie niezmienionych plików uznanych już za czyste, tylko z clamd (domyślnie SCAN_CACHE_ENABLED).
     """
-    scan_result = {"infected": [], "warnings": [], "error": None, "scanned_files": []}
+    scan_result = _new_scan_result()
+    if progress_queue is not None and not isinstance(progress_queue, ProgressAggregator):
+        progress_queue = ProgressAggregator(progress_queue)
 
     if not mount_point or not os.path.exists(mount_point):
         scan_result["error"] = "Mount point not found or invalid."
         if progress_queue: progress_queue.put(scan_result)
         return scan_result
 
-    clamscan_path = get_clamscan_path()
-    if not clamscan_path:
-        scan_result["error"] = "Nie znaleziono programu ClamAV (clamscan). Upewnij się, że jest zainstalowany."
+    clamd_client = find_clamd() if engine in ("auto", "clamd") else None
+    clamscan_path = get_clamscan_path() if clamd_client is None and engine != "clamd" else None
+    if not clamd_client and not clamscan_path:
+        scan_result["error"] = "Nie znaleziono programu ClamAV (clamd ani clamscan). Upewnij się, że jest zainstalowany."
         if progress_queue: progress_queue.put(scan_result)
         return scan_result
 
+    workers = max(1, workers or (SCAN_WORKERS if clamd_client else CLAMSCAN_WORKERS))
     if progress_queue:
         progress_queue.put({"status": "Starting scanning..."})
-    
-    log.info(f"Starting scanning for {mount_point} with {clamscan_path}...")
 
-    scanned_count = 0
+    signature_version = None
+    if SCAN_CACHE_ENABLED if use_cache is None else use_cache:
+        # clamscan czyta pliki sam, więc nie da się powiązać hasha z bajtami, które przeskanował -
+        # cache werdyktów działa tylko z clamd, gdzie hash liczymy z danych wysłanych przez INSTREAM
+        if clamd_client:
+            signature_version = get_signature_version(clamd_client)
+            if not signature_version:
+                log.warning("Nie udało się ustalić wersji sygnatur - cache werdyktów wyłączony.")
+        else:
+            log.info("Cache werdyktów wymaga clamd - skan przez clamscan bez cache.")
+
+    scanned_files_log = None
+    try:
+        scanned_files_log = ScannedFilesLog.create()
+        scan_result["scanned_files_log"] = scanned_files_log.path
+    except OSError as e:
+        log.warning(f"Nie można utworzyć logu przeskanowanych plików: {e}")
+
+    progress = ScanProgress(progress_queue, scanned_files_log)
+    use_file_list = not clamd_client and workers > 1
+    if not use_file_list:
+        progress.start_prewalk(mount_point)
+    if clamd_client:
+        log.info(f"Starting scanning for {mount_point} with clamd ({clamd_client.socket_path}), workers: {workers}...")
+        _scan_with_clamd(clamd_client, mount_point, scan_result, progress, workers, signature_version)
+    elif use_file_list:
+        log.info(f"Starting scanning for {mount_point} with {clamscan_path}, workers: {workers}...")
+        _scan_with_clamscan_parallel(clamscan_path, mount_point, scan_result, progress, workers)
+    else:
+        log.info(f"Starting scanning for {mount_point} with {clamscan_path}...")
+        _scan_with_clamscan([clamscan_path, "-r", "-v", mount_point], scan_result, progress)
+    progress.stop_prewalk()
+    if scanned_files_log:
+        scanned_files_log.close()
+
+    if progress_queue:
+        progress_queue.put({"done": True, "result": scan_result})
+        log.debug(f"Postęp: {progress_queue.received} komunikatów połączono w {progress_queue.emitted} migawek")
+    return scan_result
+
+def _clamd_worker(client, units, partial_result, progress, abort_event, signature_version=None):
+    """Worker puli clamd: pobiera jednostki pracy z kolejki i skanuje pliki przez INSTREAM."""
+    verdict_cache = VerdictCache(signature_version) if signature_version else None
+    try:
+        while True:
+            unit = units.get()
+            if unit is None:
+                return
+            # Po przerwaniu tylko opróżniamy kolejkę, aby producent nie zablokował się na put()
+            if abort_event.is_set():
+                continue
+            for file_path, size in unit:
+                cache_key = None
+                if verdict_cache:
+                    cache_key, verdict = verdict_cache.lookup(file_path)
+                    if verdict == VERDICT_CLEAN:
+                        progress.file_cached(partial_result, file_path, size)
+                        continue
+
+                progress.file_scanned(partial_result, file_path, size)
+                digest = hashlib.sha256() if cache_key else None
+                try:
+                    status, detail = client.scan_file(file_path, digest)
+                except OSError as e:
+                    partial_result["warnings"].append(f"{file_path}: {e}")
+                    continue
+                except ClamdError as e:
+                    log.error(f"Błąd komunikacji z clamd: {e}")
+                    partial_result["error"] = f"Błąd komunikacji z clamd: {e}"
+                    abort_event.set()
+                    break
+                if digest is not None:
+                    cache_key = verdict_cache.with_hash(cache_key, digest.hexdigest())
+
+                if status == "FOUND":
+                    log.warning(f"Zainfekowany plik: {file_path} (Sygnatura: {detail})")
+                    partial_result["infected"].append({'path': file_path, 'signature': detail})
+                    if verdict_cache:
+                        verdict_cache.record(cache_key, VERDICT_INFECTED)
+                elif status == "ERROR":
+                    log.warning(f"clamd nie przeskanował {file_path}: {detail}")
+                    partial_result["warnings"].append(f"{file_path}: {detail}")
+                elif verdict_cache:
+                    verdict_cache.record(cache_key, VERDICT_CLEAN)
+    finally:
+        if verdict_cache:
+            verdict_cache.close()
+
+def _scan_with_clamd(client, mount_point, scan_result, progress, workers=1, signature_version=None):
+    """
+    Strumieniuje pliki do clamd (INSTREAM) z puli `workers` wątków.
+    Jednostki pracy powstają w trakcie przechodzenia drzewa, więc skanowanie
+    rusza od razu, a workery same równoważą obciążenie, pobierając kolejne jednostki.
+    """
+    units = queue.Queue(maxsize=workers * 4)
+    abort_event = threading.Event()
+    partial_results = [_new_scan_result() for _ in range(workers)]
+    threads = [
+        threading.Thread(
+            target=_clamd_worker, args=(client, units, partial, progress, abort_event, signature_version), daemon=True
+        )
+        for partial in partial_results
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for unit in iter_work_units(iter_files(mount_point)):
+            while not abort_event.is_set():
+                try:
+                    units.put(unit, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if abort_event.is_set():
+                break
+    except Exception as e:
+        log.error(f"Krytyczny błąd podczas skanowania: {e}", exc_info=True)
+        scan_result["error"] = f"Krytyczny błąd: {e}"
+        abort_event.set()
+    finally:
+        for _ in threads:
+            units.put(None)
+        for thread in threads:
+            thread.join()
+
+    for partial in partial_results:
+        merge_scan_results(scan_result, partial)
+    log.info(f"Skanowanie clamd zakończone: {progress.scanned_count} plików "
+             f"(z cache: {scan_result['from_cache']}), {len(scan_result['infected'])} infekcji.")
+
+def _scan_with_clamscan_parallel(clamscan_path, mount_point, scan_result, progress, workers):
+    """Dzieli drzewo na `workers` koszyków o zbliżonej wielkości i skanuje je osobnymi procesami clamscan."""
+    try:
+        files = list(iter_files(mount_point))
+        # Pełne przejście drzewa i tak jest potrzebne do podziału - sumy mamy od razu
+        progress.set_totals(len(files), sum(size for _, size in files))
+        bins = partition_by_size(files, workers)
+    except Exception as e:
+        log.error(f"Krytyczny błąd podczas skanowania: {e}", exc_info=True)
+        scan_result["error"] = f"Krytyczny błąd: {e}"
+        return
+
+    partial_results = [_new_scan_result() for _ in bins]
+    list_files = []
+    threads = []
+    try:
+        for file_paths, partial in zip(bins, partial_results):
+            with tempfile.NamedTemporaryFile("w", suffix=".lst", delete=False, encoding="utf-8") as f:
+                f.write("\n".join(file_paths) + "\n")
+                list_files.append(f.name)
+            command = [clamscan_path, "-v", f"--file-list={f.name}"]
+            threads.append(threading.Thread(
+                target=_scan_with_clamscan, args=(command, partial, progress), daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        for list_file in list_files:
+            try:
+                os.unlink(list_file)
+            except OSError:
+                pass
+
+    for partial in partial_results:
+        merge_scan_results(scan_result, partial)
+
+def _scan_with_clamscan(command, scan_result, progress):
+    """Uruchamia clamscan z podanymi argumentami i parsuje jego wyjście do scan_result."""
     final_return_code = -1
     stderr_output = ""
 
     try:
-        command = [clamscan_path, "-r", "-v", mount_point]
         log.info(f"Uruchamianie polecenia: {' '.join(command)}")
         
         process = subprocess.Popen(
@@ -142,15 +915,8 @@ def scan_device(mount_point, progress_queue=None):
                    scan_result["infected"].append({'path': file_path, 'signature': signature})
             
             elif scanning_match:
-                scanned_count += 1
                 scanned_file_path = scanning_match.group(1).replace("...", "")
-                scan_result["scanned_files"].append(scanned_file_path)
-                
-                scanned_file_name = os.path.basename(scanned_file_path)
-                status_text = f"Skanowanie pliku #{scanned_count}: {scanned_file_name}"
-                
-                if progress_queue:
-                    progress_queue.put({"status": status_text})
+                progress.file_scanned(scan_result, scanned_file_path)
 
         _, stderr_output = process.communicate()
         final_return_code = process.returncode
@@ -178,7 +944,3 @@ def scan_device(mount_point, progress_queue=None):
     except Exception as e:
         log.error(f"Krytyczny błąd podczas skanowania: {e}", exc_info=True)
         scan_result["error"] = f"Krytyczny błąd: {e}"
-
-    if progress_queue:
-        progress_queue.put({"done": True, "result": scan_result})
-    return scan_result
\ No newline at end of file
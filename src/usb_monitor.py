@@ -3,12 +3,17 @@
 import platform
 import time
 import logging
-from datetime import datetime
+import errno
+import os
+import select
+import socket
 from .database import is_device_whitelisted, log_event
-from threading import Event
+from threading import Event, Lock
+from collections import namedtuple
 import queue
 import subprocess
 import plistlib
+import re
 
 # Importy specyficzne dla macOS
 try:
@@ -40,6 +45,157 @@ USB_CLASSES = {
     255: "VENDOR"
 }
 
+# Katalog sysfs z urządzeniami i interfejsami USB (Linux)
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+SYS_BLOCK = "/sys/block"
+# Interwał odpytywania magistrali w trybie fallback (sekundy)
+POLL_INTERVAL = 3
+# Grupa multicast netlink, na której jądro rozsyła uevents
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_SUBSYSTEMS = ("usb", "block")
+# Bufor gniazda netlink - seria zdarzeń przy podłączeniu huba nie może go przepełnić
+UEVENT_RCVBUF = 4 * 1024 * 1024
+
+class PollingHotplugSource:
+    """Fallback: budzi monitor co `interval` sekund i wymusza pełne wyliczenie."""
+    name = "polling"
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+
+    def wait_for_change(self, stop_event):
+        """Zwraca True, gdy należy ponownie wyliczyć urządzenia, False przy zatrzymaniu."""
+        stop_event.wait(self.interval)
+        return not stop_event.is_set()
+
+    def close(self):
+        pass
+
+class UeventHotplugSource:
+    """
+    Linux: nasłuchuje zdarzeń jądra (netlink uevent) i budzi monitor
+    tylko wtedy, gdy urządzenie USB lub dysk zostanie dodane/usunięte.
+    """
+    name = "uevent"
+
+    def __init__(self, debounce=0.02, resync_interval=60, stop_check_interval=0.5):
+        self.debounce = debounce
+        self.resync_interval = resync_interval
+        self.stop_check_interval = stop_check_interval
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_KOBJECT_UEVENT)
+        try:
+            self._set_receive_buffer()
+            self.sock.bind((0, 1))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def _set_receive_buffer(self):
+        # SO_RCVBUFFORCE (root) omija limit net.core.rmem_max; bez uprawnień zostaje SO_RCVBUF
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, getattr(socket, "SO_RCVBUFFORCE", 33), UEVENT_RCVBUF)
+        except OSError:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UEVENT_RCVBUF)
+
+    @staticmethod
+    def parse_uevent(data):
+        """Zamienia surowy komunikat uevent na słownik (ACTION, SUBSYSTEM, DEVTYPE...)."""
+        fields = {}
+        for part in data.split(b"\0")[1:]:
+            key, sep, value = part.partition(b"=")
+            if sep:
+                fields[key.decode("ascii", "ignore")] = value.decode("utf-8", "ignore")
+        return fields
+
+    def _is_relevant(self, data):
+        fields = self.parse_uevent(data)
+        if fields.get("ACTION") not in ("add", "remove"):
+            return False
+        if fields.get("SUBSYSTEM") == "usb" and fields.get("DEVPATH"):
+            # Interfejsy (i klasy) pojawiają się dopiero po skonfigurowaniu urządzenia -
+            # każde zdarzenie urządzenia/interfejsu unieważnia jego wpis w cache
+            descriptor_cache.invalidate_devpath(fields["DEVPATH"])
+        return fields.get("SUBSYSTEM") in UEVENT_SUBSYSTEMS
+
+    def _receive(self):
+        """Odbiera jeden komunikat; True, jeśli wymaga ponownego wyliczenia urządzeń."""
+        try:
+            return self._is_relevant(self.sock.recv(16384))
+        except OSError as e:
+            if e.errno != errno.ENOBUFS:
+                raise
+            # Przepełniony bufor - część zdarzeń przepadła, więc stan szyny trzeba odczytać od razu
+            log.warning("Netlink uevent buffer overflow, re-enumerating devices")
+            return True
+
+    def _drain(self, timeout):
+        """Odbiera zdarzenia przez `timeout` sekund; zwraca True, jeśli któreś było istotne."""
+        relevant = False
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return relevant
+            readable, _, _ = select.select([self.sock], [], [], remaining)
+            if not readable:
+                return relevant
+            if self._receive():
+                relevant = True
+
+    def wait_for_change(self, stop_event):
+        """Blokuje do pierwszego istotnego zdarzenia (lub okresowej resynchronizacji)."""
+        resync_at = time.monotonic() + self.resync_interval
+        while not stop_event.is_set():
+            remaining = resync_at - time.monotonic()
+            if remaining <= 0:
+                return True
+            timeout = min(self.stop_check_interval, remaining)
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if not readable:
+                continue
+            if self._receive():
+                # Hub lub dysk generuje serię zdarzeń - zbieramy je w jedno wyliczenie
+                self._drain(self.debounce)
+                return True
+        return False
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+def get_hotplug_source(backend="auto"):
+    """Wybiera źródło zdarzeń hotplug: 'uevent' na Linuksie, w pozostałych przypadkach 'polling'."""
+    if backend in ("auto", "uevent") and system == "Linux" and hasattr(socket, "AF_NETLINK"):
+        try:
+            return UeventHotplugSource()
+        except OSError as e:
+            log.warning(f"Netlink uevent listener unavailable ({e}), falling back to polling")
+    return PollingHotplugSource()
+
+# Akcje get_unauthorized_action od najpoważniejszej; przejście na wyższą pozycję ponawia alert
+UNAUTHORIZED_ACTIONS = (
+    "CRITICAL_HUB_HID_COMBO", "WARNING_HID", "WARNING_STORAGE", "WARNING_NETWORK",
+    "WARNING_SURVEILLANCE", "NOTICE_HUB", "CONNECTED_UNAUTH",
+)
+
+def get_unauthorized_action(classes_list):
+    """Klasyfikuje nieautoryzowane urządzenie po klasach USB (nazwa akcji w logach/bazie)."""
+    if "HUB" in classes_list and "HID" in classes_list:
+        return "CRITICAL_HUB_HID_COMBO"
+    if "HID" in classes_list:
+        return "WARNING_HID"
+    if "STORAGE" in classes_list:
+        return "WARNING_STORAGE"
+    if "NETWORK" in classes_list or "WIRELESS" in classes_list:
+        return "WARNING_NETWORK"
+    if "AUDIO" in classes_list or "VIDEO" in classes_list:
+        return "WARNING_SURVEILLANCE"
+    if "HUB" in classes_list:
+        return "NOTICE_HUB"
+    return "CONNECTED_UNAUTH"
+
 def set_alert_callback(callback):
     global alert_callback
     alert_callback = callback
@@ -59,87 +215,336 @@ def get_device_classes(device):
         pass
     return sorted(list(found_classes))
 
-def get_bsd_name_for_usb(product_string):
-    """Znajduje BSD Name dla urządzenia pamięci masowej na macOS."""
-    if not product_string:
-        return None
-    try:
+# Porty urządzenia USB w ścieżce sysfs, np. "1-1.2" (bez interfejsu "1-1.2:1.0")
+_SYSFS_USB_PORT_PATTERN = re.compile(r"^(\d+)-([\d.]+)$")
+
+class BlockDeviceMap:
+    """
+    Mapa urządzenie USB -> nazwa urządzenia blokowego, budowana raz na cykl
+    wyliczania i zapamiętywana, dopóki zbiór dysków w systemie się nie zmieni.
+    Linux: rozwiązywanie dowiązań /sys/block/*/device.
+    macOS: jedno `diskutil list` na cykl, `diskutil info` tylko dla nowych dysków.
+    """
+
+    def __init__(self, sys_block=None):
+        self.sys_block = sys_block or SYS_BLOCK
+        self._signature = None
+        self._by_port = {}
+        self._by_registry_name = {}
+
+    def refresh(self):
+        """Odświeża mapę, jeśli zmienił się zbiór urządzeń blokowych."""
+        try:
+            if system == "Darwin":
+                self._refresh_darwin()
+            elif system == "Linux":
+                self._refresh_linux()
+        except Exception as e:
+            log.debug(f"Block device map refresh failed: {e}")
+
+    def _refresh_linux(self):
+        signature = frozenset(os.listdir(self.sys_block))
+        if signature == self._signature:
+            return
+        by_port = {}
+        for block_name in signature:
+            device_link = os.path.join(self.sys_block, block_name, "device")
+            if not os.path.exists(device_link):
+                continue
+            # Ostatni komponent "bus-porty" w ścieżce to urządzenie USB, do którego należy dysk
+            for component in reversed(os.path.realpath(device_link).split(os.sep)):
+                match = _SYSFS_USB_PORT_PATTERN.match(component)
+                if match:
+                    by_port[match.groups()] = block_name
+                    break
+        self._by_port = by_port
+        self._signature = signature
+
+    def _refresh_darwin(self):
         result = subprocess.run(
             ["diskutil", "list", "-plist", "external", "physical"],
             capture_output=True, text=True, check=True, timeout=5
         )
         disk_list_plist = plistlib.loads(result.stdout.encode('utf-8'))
-
-        for disk_info in disk_list_plist.get('AllDisksAndPartitions', []):
-            bsd_name = disk_info.get('DeviceIdentifier')
-            if not bsd_name:
-                continue
+        bsd_names = [d.get('DeviceIdentifier') for d in disk_list_plist.get('AllDisksAndPartitions', [])]
+        signature = frozenset(name for name in bsd_names if name)
+        if signature == self._signature:
+            return
+        by_registry_name = {}
+        for bsd_name in signature:
             try:
                 info_result = subprocess.run(
                     ["diskutil", "info", "-plist", bsd_name],
                     capture_output=True, text=True, check=True, timeout=3
                 )
                 info_plist = plistlib.loads(info_result.stdout.encode('utf-8'))
-                registry_name = info_plist.get('IORegistryEntryName', '')
-                
-                if product_string in registry_name:
-                    return bsd_name
+                by_registry_name[info_plist.get('IORegistryEntryName', '')] = bsd_name
             except Exception:
                 continue
-    except Exception:
-        pass
-    return None
+        self._by_registry_name = by_registry_name
+        self._signature = signature
+
+    def lookup(self, bus=None, port_path=None, product_string=None):
+        """Zwraca nazwę urządzenia blokowego (np. 'sdb', 'disk4') lub None."""
+        if bus is not None and port_path is not None:
+            block_name = self._by_port.get((str(bus), port_path))
+            if block_name:
+                return block_name
+        if product_string:
+            for registry_name, bsd_name in self._by_registry_name.items():
+                if product_string in registry_name:
+                    return bsd_name
+        return None
+
+block_device_map = BlockDeviceMap()
+
+class CachedDevice(namedtuple("CachedDevice", "vendor_id product_id bsd_name device_name classes product")):
+    """Rozwiązane metadane urządzenia; `product` służy do ponownego szukania BSD Name."""
+
+    def record(self):
+        return (self.vendor_id, self.product_id, self.bsd_name, self.device_name, self.classes)
+
+    def has_disk(self):
+        return self.bsd_name is not None or "STORAGE" in self.classes
+
+class DescriptorCache:
+    """
+    Pamięć podręczna metadanych urządzeń kluczowana (bus, port_path, address).
+    Tylko nowo podłączone urządzenia płacą za odczyt deskryptorów.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
 
-def get_connected_devices():
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def invalidate_devpath(self, devpath):
+        """Usuwa wpis urządzenia z DEVPATH zdarzenia ('.../1-1.2' lub '.../1-1.2:1.0')."""
+        bus, port_path = _sysfs_bus_and_port(devpath.rsplit("/", 1)[-1].partition(":")[0])
+        with self._lock:
+            for key in [key for key in self._entries if key[:2] == (bus, port_path)]:
+                del self._entries[key]
+
+    def retain(self, seen_keys):
+        """Usuwa wpisy urządzeń, których nie było w bieżącym wyliczeniu."""
+        with self._lock:
+            stale = [key for key in self._entries if key not in seen_keys]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+descriptor_cache = DescriptorCache()
+
+def get_descriptor_cache_stats():
+    """Zwraca liczniki trafień/chybień cache deskryptorów."""
+    return descriptor_cache.stats()
+
+def get_connected_devices(backend="auto"):
     """Zwraca zestaw: (vendor, product, bsd, device_name, classes_tuple)"""
-    devices = set()
+    return set(get_connected_devices_by_key(backend).values())
+
+def get_connected_devices_by_key(backend="auto"):
+    """Te same rekordy co get_connected_devices, kluczowane tożsamością urządzenia (bus, port_path, address)."""
+    if backend == "sysfs" or (backend == "auto" and system == "Linux" and os.path.isdir(SYSFS_USB_DEVICES)):
+        return get_connected_devices_sysfs()
+    return get_connected_devices_pyusb()
+
+def _resolve_cached_bsd_name(key, entry):
+    # Węzeł dysku pojawia się chwilę po urządzeniu USB (i znika po wysunięciu),
+    # więc BSD Name odczytujemy z mapy dysków bieżącego cyklu
+    if entry.has_disk():
+        bus, port_path, _ = key
+        bsd_name = block_device_map.lookup(bus, port_path, entry.product)
+        if bsd_name != entry.bsd_name:
+            entry = entry._replace(bsd_name=bsd_name)
+            descriptor_cache.put(key, entry)
+    return entry
+
+def _read_pyusb_metadata(device, vendor_id_str, product_id_str, key):
+    manufacturer = ""
+    product = ""
+    if device.iManufacturer:
+        manufacturer = usb.util.get_string(device, device.iManufacturer)
+    if device.iProduct:
+        product = usb.util.get_string(device, device.iProduct)
+
+    name_parts = [part for part in [manufacturer, product] if part]
+    device_name = " ".join(name_parts) if name_parts else "Unknown Device"
+    classes_tuple = tuple(get_device_classes(device))
+    entry = CachedDevice(vendor_id_str, product_id_str, None, device_name, classes_tuple, product)
+    return _resolve_cached_bsd_name(key, entry)
+
+def get_connected_devices_pyusb():
+    """Wylicza urządzenia przez pyusb (deskryptory czytane bezpośrednio z urządzeń); klucz -> rekord."""
+    devices = {}
     if 'usb' not in globals():
         return devices
 
+    seen_keys = set()
+    block_device_map.refresh()
     try:
         for device in usb.core.find(find_all=True):
             vendor_id_str = f"0x{device.idVendor:04x}"
             product_id_str = f"0x{device.idProduct:04x}"
-            bsd_name = None
-            device_name = "Unknown Device"
-            device_classes = []
+            port_path = ".".join(str(port) for port in (device.port_numbers or ())) or "0"
+            key = (str(device.bus), port_path, device.address)
+            seen_keys.add(key)
 
-            try:
-                manufacturer = ""
-                product = ""
-                if device.iManufacturer:
-                    manufacturer = usb.util.get_string(device, device.iManufacturer)
-                if device.iProduct:
-                    product = usb.util.get_string(device, device.iProduct)
-                
-                name_parts = [part for part in [manufacturer, product] if part]
-                if name_parts:
-                    device_name = " ".join(name_parts)
-
-                if product:
-                    bsd_name = get_bsd_name_for_usb(product)
-                
-                device_classes = get_device_classes(device)
-                classes_tuple = tuple(device_classes)
-                
-                devices.add((vendor_id_str, product_id_str, bsd_name, device_name, classes_tuple))
+            entry = descriptor_cache.get(key)
+            if entry is not None:
+                devices[key] = _resolve_cached_bsd_name(key, entry).record()
+                continue
 
+            try:
+                entry = _read_pyusb_metadata(device, vendor_id_str, product_id_str, key)
+                descriptor_cache.put(key, entry)
+                devices[key] = entry.record()
             except Exception:
-                devices.add((vendor_id_str, product_id_str, None, "Unknown Device", ()))
+                devices[key] = (vendor_id_str, product_id_str, None, "Unknown Device", ())
     except Exception as e:
         log.error(f"Scan error: {e}")
+        return devices
+
+    descriptor_cache.retain(seen_keys)
+    return devices
+
+def _read_sysfs_attr(device_path, attr, default=""):
+    try:
+        with open(os.path.join(device_path, attr), encoding="utf-8", errors="replace") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+def _parse_class_code(value):
+    try:
+        return int(value, 16)
+    except ValueError:
+        return None
+
+def _sysfs_bus_and_port(entry):
+    """'1-1.2' -> ('1', '1.2'); root hub 'usb1' -> ('1', '0')."""
+    if entry.startswith("usb"):
+        return entry[3:], "0"
+    bus, _, port_path = entry.partition("-")
+    return bus, port_path
+
+def _read_sysfs_metadata(device_path, interface_paths, key):
+    vendor = _read_sysfs_attr(device_path, "idVendor")
+    product_code = _read_sysfs_attr(device_path, "idProduct")
+    try:
+        vendor_id_str = f"0x{int(vendor, 16):04x}"
+        product_id_str = f"0x{int(product_code, 16):04x}"
+    except ValueError:
+        return None
+
+    manufacturer = _read_sysfs_attr(device_path, "manufacturer")
+    product = _read_sysfs_attr(device_path, "product")
+    name_parts = [part for part in [manufacturer, product] if part]
+    device_name = " ".join(name_parts) if name_parts else "Unknown Device"
+
+    found_classes = set()
+    for class_code in [_read_sysfs_attr(device_path, "bDeviceClass")] + [
+        _read_sysfs_attr(path, "bInterfaceClass") for path in interface_paths
+    ]:
+        class_code = _parse_class_code(class_code)
+        if class_code in USB_CLASSES:
+            found_classes.add(USB_CLASSES[class_code])
+
+    entry = CachedDevice(vendor_id_str, product_id_str, None, device_name, tuple(sorted(found_classes)), product)
+    return _resolve_cached_bsd_name(key, entry)
+
+def get_connected_devices_sysfs(sysfs_root=None):
+    """
+    Linux: buduje te same rekordy co get_connected_devices (klucz -> rekord),
+    czytając atrybuty z /sys/bus/usb/devices w jednym przebiegu (bez otwierania urządzeń).
+    """
+    devices = {}
+    sysfs_root = sysfs_root or SYSFS_USB_DEVICES
+    try:
+        entries = os.listdir(sysfs_root)
+    except OSError as e:
+        log.error(f"Scan error: {e}")
+        return devices
+
+    # Interfejsy mają nazwy "<urządzenie>:<konfiguracja>.<interfejs>", np. "1-1.2:1.0"
+    interface_paths = {}
+    device_entries = []
+    for entry in entries:
+        if ":" in entry:
+            parent, _, _ = entry.partition(":")
+            bus, _, port_path = parent.partition("-")
+            if port_path == "0":
+                # Interfejs root huba ("1-0:1.0") należy do katalogu "usb1"
+                parent = f"usb{bus}"
+            interface_paths.setdefault(parent, []).append(os.path.join(sysfs_root, entry))
+        else:
+            device_entries.append(entry)
+
+    seen_keys = set()
+    block_device_map.refresh()
+    for entry in device_entries:
+        device_path = os.path.join(sysfs_root, entry)
+        bus, port_path = _sysfs_bus_and_port(entry)
+        address = _read_sysfs_attr(device_path, "devnum")
+        if not address:
+            continue
+        key = (bus, port_path, address)
+        seen_keys.add(key)
+
+        cached = descriptor_cache.get(key)
+        if cached is not None:
+            devices[key] = _resolve_cached_bsd_name(key, cached).record()
+            continue
+
+        device_interfaces = interface_paths.get(entry, ())
+        cached = _read_sysfs_metadata(device_path, device_interfaces, key)
+        if cached is None:
+            continue
+        # Nieskonfigurowane urządzenie nie ma jeszcze interfejsów - klasy byłyby niepełne,
+        # więc taki odczyt nie trafia do cache i zostanie powtórzony w kolejnym cyklu
+        if device_interfaces and _read_sysfs_attr(device_path, "bConfigurationValue"):
+            descriptor_cache.put(key, cached)
+        devices[key] = cached.record()
 
+    descriptor_cache.retain(seen_keys)
     return devices
 
-def monitor_usb(app_instance):
-    previous_devices = set()
+def monitor_usb(app_instance, hotplug_source=None):
+    previous_devices = {}
+    if hotplug_source is None:
+        hotplug_source = get_hotplug_source()
+    log.info(f"Hotplug backend: {hotplug_source.name}")
     
     try:
-        previous_devices = get_connected_devices()
+        previous_devices = get_connected_devices_by_key()
         if app_instance:
-            app_instance.after(0, app_instance.update_device_list_from_monitor, previous_devices.copy())
+            app_instance.after(0, app_instance.update_device_list_from_monitor, set(previous_devices.values()))
         
-        for vendor_id, product_id, bsd_name, device_name, device_classes in previous_devices:
+        for vendor_id, product_id, bsd_name, device_name, device_classes in previous_devices.values():
              if not is_device_whitelisted(vendor_id, product_id):
                   if (vendor_id, product_id) not in _already_alerted:
                       alert_queue.put((vendor_id, product_id, bsd_name, list(device_classes)))
@@ -147,43 +552,57 @@ def monitor_usb(app_instance):
     except Exception:
         pass
 
+    try:
+        _monitor_loop(app_instance, hotplug_source, previous_devices)
+    finally:
+        hotplug_source.close()
+
+def _handle_updated_device(previous, current):
+    """
+    To samo urządzenie z nowymi metadanymi: klasy i BSD Name uzupełniają się po
+    konfiguracji, już po pierwszym wyliczeniu. Ostrzejsza klasyfikacja ponawia alert.
+    """
+    vendor_id, product_id, bsd_name, device_name, device_classes = current
+    if device_classes == previous[4] or is_device_whitelisted(vendor_id, product_id):
+        return
+    previous_action = get_unauthorized_action(list(previous[4]))
+    classes_list = list(device_classes)
+    action = get_unauthorized_action(classes_list)
+    if UNAUTHORIZED_ACTIONS.index(action) >= UNAUTHORIZED_ACTIONS.index(previous_action):
+        return
+
+    log.warning(f"Reclassified: {vendor_id}:{product_id} ({device_name}) [{previous_action} -> {action}] Classes: {classes_list}")
+    log_event(int(time.time()), vendor_id, product_id, action)
+    alert_queue.put((vendor_id, product_id, bsd_name, classes_list))
+    _already_alerted.add((vendor_id, product_id))
+
+def _monitor_loop(app_instance, hotplug_source, previous_devices):
     while not stop_event.is_set():
         try:
-            stop_event.wait(3)
-            if stop_event.is_set():
+            if not hotplug_source.wait_for_change(stop_event):
                 break
                 
-            current_devices = get_connected_devices()
+            current_devices = get_connected_devices_by_key()
+            log.debug(f"Descriptor cache: {get_descriptor_cache_stats()}")
 
             if current_devices != previous_devices:
-                added_devices = current_devices - previous_devices
-                removed_devices = previous_devices - current_devices
+                # Porównanie po tożsamości urządzenia - zmiana klas lub BSD Name to aktualizacja, nie odłączenie
+                added_keys = current_devices.keys() - previous_devices.keys()
+                removed_keys = previous_devices.keys() - current_devices.keys()
 
                 if app_instance:
-                    app_instance.after(0, app_instance.update_device_list_from_monitor, current_devices.copy())
+                    app_instance.after(0, app_instance.update_device_list_from_monitor, set(current_devices.values()))
 
-                for vendor_id, product_id, bsd_name, device_name, device_classes in added_devices:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                for key in added_keys:
+                    vendor_id, product_id, bsd_name, device_name, device_classes = current_devices[key]
+                    timestamp = int(time.time())
                     classes_list = list(device_classes)
                     
                     if is_device_whitelisted(vendor_id, product_id):
                         log.info(f"Authorized: {vendor_id}:{product_id} ({device_name})")
                         log_event(timestamp, vendor_id, product_id, "CONNECTED_AUTH")
                     else:
-                        action = "CONNECTED_UNAUTH"
-                        
-                        if "HUB" in classes_list and "HID" in classes_list:
-                            action = "CRITICAL_HUB_HID_COMBO"
-                        elif "HID" in classes_list:
-                            action = "WARNING_HID"
-                        elif "STORAGE" in classes_list: # --- NOWE: Logowanie Storage ---
-                            action = "WARNING_STORAGE"
-                        elif "NETWORK" in classes_list or "WIRELESS" in classes_list:
-                            action = "WARNING_NETWORK"
-                        elif "AUDIO" in classes_list or "VIDEO" in classes_list:
-                            action = "WARNING_SURVEILLANCE"
-                        elif "HUB" in classes_list:
-                            action = "NOTICE_HUB"
+                        action = get_unauthorized_action(classes_list)
                         
                         log.warning(f"Unauthorized: {vendor_id}:{product_id} ({device_name}) [{action}] Classes: {classes_list}")
                         log_event(timestamp, vendor_id, product_id, action)
@@ -192,8 +611,13 @@ def monitor_usb(app_instance):
                             alert_queue.put((vendor_id, product_id, bsd_name, classes_list))
                             _already_alerted.add((vendor_id, product_id))
 
-                for vendor_id, product_id, bsd_name, device_name, device_classes in removed_devices:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                for key in current_devices.keys() & previous_devices.keys():
+                    if current_devices[key] != previous_devices[key]:
+                        _handle_updated_device(previous_devices[key], current_devices[key])
+
+                for key in removed_keys:
+                    vendor_id, product_id, bsd_name, device_name, device_classes = previous_devices[key]
+                    timestamp = int(time.time())
                     log.info(f"Disconnected: {vendor_id}:{product_id} ({device_name})")
                     log_event(timestamp, vendor_id, product_id, "DISCONNECTED")
                     _already_alerted.discard((vendor_id, product_id))
@@ -201,4 +625,4 @@ def monitor_usb(app_instance):
                 previous_devices = current_devices
         except Exception as e:
             log.error(f"Monitor loop error: {e}")
-            stop_event.wait(5)
\ No newline at end of file
+            stop_event.wait(5)
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark: whitelist lookups per second with a connection opened per
+call (previous behaviour), the pooled per-thread WAL connection and the
+in-memory whitelist cache used by is_device_whitelisted.
+
+Usage: python tools/bench_database.py [--lookups N] [--entries N]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+
+
+def lookup_connect_per_call(db_file, vendor_id, product_id):
+    conn = sqlite3.connect(db_file)
+    try:
+        c = conn.cursor()
+        c.execute("SELECT 1 FROM whitelist WHERE vendor_id=? AND product_id=?", (vendor_id, product_id))
+        return c.fetchone() is not None
+    finally:
+        conn.close()
+
+
+def lookup_pooled(vendor_id, product_id):
+    c = database.get_connection().execute(
+        "SELECT 1 FROM whitelist WHERE vendor_id=? AND product_id=?", (vendor_id, product_id)
+    )
+    return c.fetchone() is not None
+
+
+def run(label, lookup, keys):
+    start = time.perf_counter()
+    for vendor_id, product_id in keys:
+        lookup(vendor_id, product_id)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {len(keys) / elapsed:>12,.0f} lookups/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--entries", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        database.create_db()
+        for i in range(args.entries):
+            database.add_to_whitelist(f"0x{i:04x}", "0x0001", f"Device {i}")
+
+        keys = [(f"0x{i % (args.entries * 2):04x}", "0x0001") for i in range(args.lookups)]
+        run("connect per call", lambda v, p: lookup_connect_per_call(database.DB_FILE, v, p), keys)
+        run("pooled connection", lookup_pooled, keys)
+        run("whitelist cache", database.is_device_whitelisted, keys)
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: event history queries on the legacy `logs` table (TEXT timestamps,
+no indexes) versus the migrated `events` schema (epoch seconds, interned
+devices, indexes on ts and device_id, ts), plus the migration itself.
+
+Usage: python tools/bench_events.py [--rows N] [--devices N] [--days N]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+
+ACTIONS = ["CONNECTED_AUTH", "DISCONNECTED", "CONNECTED_UNAUTH", "WARNING_STORAGE", "WARNING_HID"]
+
+
+def build_legacy_db(db_file, rows, devices, days):
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            vendor_id TEXT,
+            product_id TEXT,
+            action TEXT NOT NULL
+        )
+    """)
+    rng = random.Random(1)
+    now = time.time()
+    start = now - days * 86400
+    step = (now - start) / rows
+    batch = []
+    for i in range(rows):
+        device = rng.randrange(devices)
+        ts = datetime.fromtimestamp(start + i * step).strftime("%Y-%m-%d %H:%M:%S")
+        batch.append((ts, f"0x{device:04x}", f"0x{device * 7 % 65536:04x}", rng.choice(ACTIONS)))
+        if len(batch) == 100000:
+            conn.executemany("INSERT INTO logs (timestamp, vendor_id, product_id, action) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    conn.executemany("INSERT INTO logs (timestamp, vendor_id, product_id, action) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    return conn
+
+
+def timed(label, fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<34} {best * 1000:>9.1f} ms  ({len(result)} rows)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    week_ago = datetime.fromtimestamp(time.time() - 7 * 86400)
+    month_ago = datetime.fromtimestamp(time.time() - 30 * 86400)
+    hour_ago = datetime.fromtimestamp(time.time() - 3600)
+    vendor_id, product_id = "0x002a", f"0x{42 * 7:04x}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        legacy = build_legacy_db(database.DB_FILE, args.rows, args.devices, args.days)
+        print(f"Generated {args.rows:,} legacy rows in {time.perf_counter() - start:.1f}s")
+
+        print("Legacy logs table:")
+        fmt = "%Y-%m-%d %H:%M:%S"
+        timed("device events, last week", lambda: legacy.execute(
+            "SELECT * FROM logs WHERE vendor_id=? AND product_id=? AND timestamp>=? ORDER BY timestamp DESC",
+            (vendor_id, product_id, week_ago.strftime(fmt))).fetchall())
+        timed("unauthorized per day, 30 days", lambda: legacy.execute(
+            "SELECT substr(timestamp, 1, 10), action, COUNT(*) FROM logs "
+            "WHERE action='CONNECTED_UNAUTH' AND timestamp>=? GROUP BY 1, 2",
+            (month_ago.strftime(fmt),)).fetchall())
+        timed("all events, last hour", lambda: legacy.execute(
+            "SELECT * FROM logs WHERE timestamp>=? ORDER BY timestamp", (hour_ago.strftime(fmt),)).fetchall())
+        legacy.close()
+
+        start = time.perf_counter()
+        database.create_db()
+        print(f"Migration to schema v{database.SCHEMA_VERSION}: {time.perf_counter() - start:.1f}s")
+
+        print("Events schema:")
+        timed("device events, last week", lambda: database.get_device_events(vendor_id, product_id, since=week_ago))
+        timed("unauthorized per day, 30 days", lambda: database.aggregate_events(
+            "day", since=month_ago, action="CONNECTED_UNAUTH"))
+        timed("all events, last hour", lambda: database.query_events(since=hour_ago).fetchall())
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
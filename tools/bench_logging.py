@@ -0,0 +1,93 @@
+"""
+Micro-benchmark: caller-side latency of logger.debug/info with handlers
+attached directly to the 'secure_usb' logger (previous behaviour) and with
+the QueueHandler/QueueListener pipeline configured by setup_logger.
+
+Console output is redirected to os.devnull so terminal speed does not skew
+the numbers.
+
+Usage: python tools/bench_logging.py [--calls N] [--json]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import logger as logger_module
+
+
+def setup_direct(log_file):
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('secure_usb')
+    logger.handlers.clear()
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    console_handler.setLevel(logging.INFO)
+    logger_module.ring_buffer_handler.setFormatter(formatter)
+    for handler in (file_handler, console_handler, logger_module.ring_buffer_handler):
+        logger.addHandler(handler)
+
+
+def teardown_direct():
+    logger = logging.getLogger('secure_usb')
+    for handler in list(logger.handlers):
+        if handler is not logger_module.ring_buffer_handler:
+            handler.close()
+    logger.handlers.clear()
+
+
+def run(label, calls):
+    log = logging.getLogger('secure_usb.monitor')
+    samples = []
+    start = time.perf_counter()
+    for i in range(calls):
+        t0 = time.perf_counter_ns()
+        if i % 2:
+            log.info("Device connected: %s (vid=%s pid=%s)", "Kingston DataTraveler", "0x0951", "0x1666")
+        else:
+            log.debug("Polling cycle %d finished", i)
+        samples.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    p50 = samples[len(samples) // 2] / 1000
+    p99 = samples[int(len(samples) * 0.99)] / 1000
+    print(f"{label:<18} {calls / elapsed:>10,.0f} calls/s   p50 {p50:6.1f} us   p99 {p99:7.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--json", action="store_true", help="enable JSON-lines output in the queued setup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        logger_module.LOG_FILE = os.path.join(tmp, "events.log")
+        logger_module.LOG_JSON_FILE = os.path.join(tmp, "events.jsonl")
+        stderr, sys.stderr = sys.stderr, devnull
+        try:
+            setup_direct(logger_module.LOG_FILE)
+            run("direct handlers", args.calls)
+            teardown_direct()
+
+            logger_module.setup_logger(json_lines=args.json)
+            run("queue listener", args.calls)
+            drain_start = time.perf_counter()
+            logger_module.shutdown_logger()
+            drain = time.perf_counter() - drain_start
+        finally:
+            sys.stderr = stderr
+        print(f"{'listener drain':<18} {drain * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: files/s of scan_device on a synthetic tree for increasing worker
+counts, against a real clamd (--socket, or the usual socket paths). Without
+a running clamd the benchmark is skipped.
+
+--fake uses the fake clamd from tools/fake_clamd.py instead. It only sleeps
+--scan-delay per file, so its numbers show how well the worker pool overlaps
+per-file latency - not scanning throughput and not scaling with cores.
+
+Usage: python tools/bench_parallel_scan.py [--files N] [--size BYTES] [--socket PATH | --fake]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src import scanner
+from fake_clamd import FakeClamd
+
+
+def build_tree(root, files, size):
+    payload = os.urandom(size)
+    for i in range(files):
+        directory = os.path.join(root, f"dir{i % 16:02d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file{i:05d}.bin"), "wb") as f:
+            f.write(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--size", type=int, default=256 * 1024)
+    parser.add_argument("--scan-delay", type=float, default=0.005, help="per-file delay of the fake clamd")
+    parser.add_argument("--socket", help="socket of a running clamd (default: autodetect)")
+    parser.add_argument("--fake", action="store_true", help="use the fake clamd (latency overlap only)")
+    args = parser.parse_args()
+
+    if args.socket:
+        scanner.CLAMD_SOCKET = args.socket
+    if not args.fake:
+        client = scanner.find_clamd()
+        if client is None:
+            print("No running clamd found (use --socket PATH), skipping. "
+                  "--fake measures latency overlap with a fake daemon instead.")
+            return 0
+        print(f"clamd {client.socket_path}: {client.version()}, {os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, "tree")
+        build_tree(tree, args.files, args.size)
+        # Logi przeskanowanych plików trafiają do katalogu tymczasowego, nie do logs/scans
+        scanner.SCAN_LOG_DIR = os.path.join(tmp, "scans")
+
+        fake = None
+        if args.fake:
+            fake = FakeClamd(os.path.join(tmp, "clamd.sock"), scan_delay=args.scan_delay).start()
+            scanner.CLAMD_SOCKET = fake.socket_path
+            print(f"fake clamd, {args.scan_delay * 1000:g} ms sleep per file: "
+                  f"latency overlap only, not scan throughput")
+
+        worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        try:
+            for workers in worker_counts:
+                start = time.perf_counter()
+                result = scanner.scan_device(tree, engine="clamd", workers=workers, use_cache=False)
+                elapsed = time.perf_counter() - start
+                scanned = result["scanned_count"]
+                print(f"workers={workers:<3} {scanned / elapsed:>10,.0f} files/s  ({elapsed:.2f} s)")
+        finally:
+            if fake:
+                fake.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
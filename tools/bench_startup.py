@@ -0,0 +1,90 @@
+"""
+Startup benchmark: import cost of the CLI, headless and GUI entry points,
+measured with `python -X importtime` in fresh interpreters.
+
+Reports the cumulative import time of each path (best of N runs), the module
+count, the slowest top-level imports, and whether any GUI module
+(tkinter/customtkinter/PIL) was loaded. Exits with status 1 if the CLI path
+exceeds --cli-budget-ms or pulls in a GUI module.
+
+Usage: python tools/bench_startup.py [--runs N] [--cli-budget-ms MS] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = {
+    "cli": "src.add_to_whitelist",
+    "headless": "src.daemon",
+    "gui": "src.gui",
+}
+GUI_MODULES = ("tkinter", "_tkinter", "customtkinter", "PIL")
+
+
+def parse_importtime(stderr):
+    """-X importtime lines -> list of (module, cumulative_us, depth)."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(cumulative), depth))
+    return entries
+
+
+def measure(module):
+    """One fresh interpreter importing `module`; returns (entries, error)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    entries = parse_importtime(result.stderr)
+    error = None
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1]
+    return entries, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cli-budget-ms", type=float, default=100.0)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for label, module in PATHS.items():
+        best = None
+        for _ in range(args.runs):
+            entries, error = measure(module)
+            # Czas ścieżki = suma modułów importowanych z najwyższego poziomu
+            total_us = sum(cumulative for _, cumulative, depth in entries if depth == 1)
+            if best is None or total_us < best[0]:
+                best = (total_us, entries, error)
+        total_us, entries, error = best
+
+        gui_loaded = sorted({name for name, _, _ in entries if name.split(".")[0] in GUI_MODULES})
+        status = f"FAILED ({error})" if error else "ok"
+        print(f"{label:<9} {total_us / 1000:>8.1f} ms  {len(entries):>4} modules  import {module}: {status}")
+        top = sorted((e for e in entries if e[2] == 1), key=lambda e: e[1], reverse=True)[:args.top]
+        for name, cumulative, _ in top:
+            print(f"          {cumulative / 1000:>8.1f} ms  {name}")
+        if gui_loaded:
+            print(f"          GUI modules loaded: {', '.join(gui_loaded[:5])}")
+
+        if label == "cli":
+            if error or gui_loaded:
+                failed = True
+            if total_us / 1000 > args.cli_budget_ms:
+                print(f"          over budget: {total_us / 1000:.1f} ms > {args.cli_budget_ms:.1f} ms")
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Minimal fake clamd speaking the subset of the clamd protocol used by
+src/scanner.py (PING, VERSION, INSTREAM with z/n command prefixes).
+Any stream containing one of the configured byte markers is reported as
+infected, so protocol handling can be exercised without ClamAV installed.
+
+Usage: python tools/fake_clamd.py /tmp/clamd.sock
+       SECURE_USB_CLAMD_SOCKET=/tmp/clamd.sock python main.py
+"""
+import os
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+EICAR_MARKER = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+DEFAULT_SIGNATURES = {EICAR_MARKER: "Eicar-Test-Signature"}
+
+
+class _ClamdHandler(socketserver.BaseRequestHandler):
+    def _read_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client closed the connection")
+            data += chunk
+        return data
+
+    def _read_command(self):
+        prefix = self._read_exact(1)
+        terminator = {b"z": b"\0", b"n": b"\n"}.get(prefix)
+        if terminator is None:
+            return None, None
+        command = b""
+        while not command.endswith(terminator):
+            command += self._read_exact(1)
+        return command[:-1], terminator
+
+    def handle(self):
+        command, terminator = self._read_command()
+        if command is None:
+            return
+        server = self.server
+        if command == b"PING":
+            reply = "PONG"
+        elif command == b"VERSION":
+            reply = server.version
+        elif command == b"INSTREAM":
+            reply = self._instream()
+        else:
+            reply = "UNKNOWN COMMAND"
+        with server.lock:
+            server.commands.append(command.decode())
+        self.request.sendall(reply.encode() + terminator)
+
+    def _instream(self):
+        server = self.server
+        received = bytearray()
+        while True:
+            (length,) = struct.unpack("!L", self._read_exact(4))
+            if length == 0:
+                break
+            if len(received) + length > server.stream_max_length:
+                return "INSTREAM size limit exceeded. ERROR"
+            received += self._read_exact(length)
+        if server.scan_delay:
+            time.sleep(server.scan_delay)
+        with server.lock:
+            server.streams_scanned += 1
+        for marker, signature in server.signatures.items():
+            if marker in received:
+                return f"stream: {signature} FOUND"
+        return "stream: OK"
+
+
+class FakeClamd(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, signatures=None, stream_max_length=25 * 1024 * 1024,
+                 version="ClamAV 1.0.0/27000/Thu Jan  1 00:00:00 2026", scan_delay=0.0):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _ClamdHandler)
+        self.socket_path = socket_path
+        self.signatures = dict(signatures or DEFAULT_SIGNATURES)
+        self.stream_max_length = stream_max_length
+        self.version = version
+        # Simulated per-stream scan time, models the work of a multi-threaded clamd
+        self.scan_delay = scan_delay
+        self.lock = threading.Lock()
+        self.commands = []
+        self.streams_scanned = 0
+        self._thread = None
+
+    def start(self):
+        """Serve in a background thread (for use from scripts and tests)."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python tools/fake_clamd.py <socket_path>")
+        return
+    server = FakeClamd(sys.argv[1])
+    print(f"Fake clamd listening on {server.socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()